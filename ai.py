@@ -1,111 +1,800 @@
+import json
 import random
 import time
 
+from rules import KING_OFFSETS, KNIGHT_OFFSETS, SLIDING_DIRECTIONS
+
 # Constants
 CHECKMATE = 1000000
 STALEMATE = 0
 DEPTH = 2
-AI_MOVE_DELAY = 0.5  # Reduced delay for better responsiveness
+AI_MOVE_DELAY = 0.5  # Least time findBestMove takes, to match human pace
+AI_MOVE_TIME = 1.0  # Seconds findBestMove may think per move
+MATE_BOUND = CHECKMATE - 1000  # Scores beyond this are mates, adjusted by ply
+TT_SIZE = 200000  # Transposition table entries before it is cleared
 
-def findBestMove(board, validMoves, board_size='6x6'):
-    """Find the best move that doesn't leave own king in check and doesn't capture opponent's king"""
-    
-    # Add delay to match human pace
-    time.sleep(AI_MOVE_DELAY)
+# Transposition table bound types
+EXACT, LOWER, UPPER = 0, 1, 2
+
+# Piece values used to order captures (most valuable victim, least valuable attacker)
+CAPTURE_VALUES = {'P': 10, 'N': 30, 'B': 30, 'R': 50, 'Q': 90, 'K': 900}
+
+# The terms evaluateBoard adds up: material balance per piece type, then
+# counts of the side to move's own pieces and moves
+FEATURES = ('P', 'N', 'B', 'R', 'Q', 'K', 'center', 'development', 'mobility', 'check', 'connectedPawns')
+
+# Weight of each feature per board size; loadWeights replaces them with tuned ones
+DEFAULT_WEIGHTS = {
+    size: dict({'P': 0, 'N': 0, 'B': 0, 'R': 0, 'Q': 0, 'K': 0}, **values,
+               center=5, development=3, mobility=0.5, check=20, connectedPawns=2)
+    for size, values in {
+        '4x4': {'B': 30, 'Q': 90, 'K': 900},
+        '6x6': {'P': 10, 'N': 30, 'B': 30, 'Q': 90, 'K': 900},
+        '8x8': {'P': 10, 'N': 30, 'B': 30, 'R': 50, 'Q': 90, 'K': 900},
+    }.items()
+}
+WEIGHTS = {size: [weights[name] for name in FEATURES] for size, weights in DEFAULT_WEIGHTS.items()}
+
+# Selective search
+NULL_MOVE_REDUCTION = 2  # Extra plies taken off the null-move search
+NULL_MOVE_MIN_PIECES = 2  # Pieces besides the king the side to move needs before it may pass
+LMR_FULL_DEPTH_MOVES = 3  # Moves searched at full depth before later quiet moves are reduced
+LMR_MIN_DEPTH = 3  # Only reduce with at least this much depth left
+FUTILITY_MARGINS = {1: 40, 2: 90}  # Depth left -> how far below alpha quiet moves are hopeless
+ASPIRATION_WINDOW = 25  # Half-width of the first root window around the previous score
+ASPIRATION_MAX = 400  # Past this half-width a failing side of the window is opened fully
+MAX_PLY = 64
+EVAL_CACHE_SIZE = 1 << 16  # Slots in the evaluation cache
+PAWN_CACHE_SIZE = 1 << 12  # Slots in the pawn-structure cache
+
+# Time management
+MAX_DEPTH = 32  # Deepest iteration a timed search starts
+SOFT_TIME_FRACTION = 0.5  # Share of a per-move budget after which no new iteration starts
+MOVE_OVERHEAD = 0.02  # Seconds kept back from every budget for the work around the search
+MOVES_TO_GO = 30  # Moves a game clock is shared between when the caller doesn't say
+INCREMENT_SHARE = 0.75  # Part of the increment spent on each move
+HARD_TIME_FACTOR = 3.0  # A clock search may run to this many times its target...
+MAX_CLOCK_SHARE = 0.25  # ...but never use more than this share of the time left
+TIME_CHECK_MASK = 15  # Look at the clock and for stop requests every 16 nodes
+ITERATION_GROWTH = 4.0  # Assumed time ratio between iterations until two have been measured
+COOPERATIVE_SLICE = 0.008  # Seconds a CooperativeSearch runs per step, e.g. per frame of the game loop
+
+STATS_LOG = None  # Path of a JSON-lines file that findBestMove appends each search's statistics to
+
+def loadWeights(path):
+    """Use the evaluation weights in a JSON file written by tuner.py
+
+    The file maps board sizes to {feature: weight}; sizes and features it
+    leaves out keep their current weights.
+    """
+    with open(path) as f:
+        data = json.load(f)
+    for size, weights in data.items():
+        if size not in WEIGHTS:
+            raise ValueError(f"Unknown board size {size!r} in {path}")
+        unknown = set(weights) - set(FEATURES)
+        if unknown:
+            raise ValueError(f"Unknown features {sorted(unknown)} in {path}")
+        current = WEIGHTS[size]
+        WEIGHTS[size] = [float(weights.get(name, current[i])) for i, name in enumerate(FEATURES)]
+    EVAL_CACHE.clear()  # Scores cached under the old weights
+
+class SearchAborted(Exception):
+    """Raised inside the search when its node budget or time runs out, or it is told to stop"""
+
+class HashCache:
+    """Fixed number of slots indexed by key hash; a new entry replaces whatever shared its slot"""
+
+    def __init__(self, size):
+        self.size = size
+        self.slots = [None] * size
+        self.probes = 0
+        self.hits = 0
+
+    def get(self, key):
+        self.probes += 1
+        entry = self.slots[hash(key) % self.size]
+        if entry is not None and entry[0] == key:
+            self.hits += 1
+            return entry[1]
+        return None
+
+    def put(self, key, value):
+        self.slots[hash(key) % self.size] = (key, value)
+
+    def hitRate(self):
+        return self.hits / self.probes if self.probes else 0.0
+
+    def clear(self):
+        self.slots = [None] * self.size
+        self.probes = self.hits = 0
+
+# Shared by every search: evaluations keyed by (board size, side, position hash),
+# pawn terms keyed by (dimension, pawn hash)
+EVAL_CACHE = HashCache(EVAL_CACHE_SIZE)
+PAWN_CACHE = HashCache(PAWN_CACHE_SIZE)
+
+class TimeManager:
+    """Soft and hard deadlines for one move
+
+    Give either a fixed budget for the move, or the time left on the mover's
+    clock with its increment. No new iteration starts after the soft deadline,
+    or when the last iterations say the next one cannot finish before the hard
+    deadline; a search still running at the hard deadline is abandoned and
+    the best move of the last finished iteration is played.
+    """
+
+    def __init__(self, moveTime=None, remaining=None, increment=0.0, movesToGo=None):
+        if moveTime is None and remaining is None:
+            raise ValueError("TimeManager needs a move time or the time remaining on the clock")
+        if moveTime is not None:
+            self.hard = max(moveTime - MOVE_OVERHEAD, 0.0)
+            self.soft = self.hard * SOFT_TIME_FRACTION
+        else:
+            target = remaining / (movesToGo or MOVES_TO_GO) + increment * INCREMENT_SHARE
+            self.hard = max(min(target * HARD_TIME_FACTOR, remaining * MAX_CLOCK_SHARE) - MOVE_OVERHEAD, 0.0)
+            self.soft = min(target, self.hard)
+        self.start()
+
+    def start(self):
+        """Start the move's clock; the deadlines are measured from here"""
+        self.startTime = time.perf_counter()
+        self.softDeadline = self.startTime + self.soft
+        self.hardDeadline = self.startTime + self.hard
+
+    def elapsed(self):
+        return time.perf_counter() - self.startTime
+
+    def hardExpired(self):
+        return time.perf_counter() >= self.hardDeadline
+
+    def canDeepen(self, iterations):
+        """Whether another iteration should start, given SearchStats.iterations so far"""
+        now = time.perf_counter()
+        if now >= self.softDeadline:
+            return False
+        growth = ITERATION_GROWTH
+        if len(iterations) >= 2 and iterations[-2]['elapsed'] > 0:
+            growth = max(iterations[-1]['elapsed'] / iterations[-2]['elapsed'], 1.0)
+        last = iterations[-1]['elapsed'] if iterations else 0.0
+        return now + last * growth < self.hardDeadline
+
+class SearchOptions:
+    """On/off switches and parameters for the selective parts of the search"""
+
+    def __init__(self, nullMove=True, nullMoveReduction=NULL_MOVE_REDUCTION, nullMoveVerify=True,
+                 lateMoveReductions=True, lmrFullDepthMoves=LMR_FULL_DEPTH_MOVES, lmrMinDepth=LMR_MIN_DEPTH,
+                 futility=True, futilityMargins=None, aspiration=True, aspirationWindow=ASPIRATION_WINDOW,
+                 killerMoves=True):
+        self.nullMove = nullMove
+        self.nullMoveReduction = nullMoveReduction
+        self.nullMoveVerify = nullMoveVerify  # Confirm null-move cutoffs on 4x4 and 6x6, where zugzwang is common
+        self.lateMoveReductions = lateMoveReductions
+        self.lmrFullDepthMoves = lmrFullDepthMoves
+        self.lmrMinDepth = lmrMinDepth
+        self.futility = futility
+        self.futilityMargins = futilityMargins if futilityMargins is not None else dict(FUTILITY_MARGINS)
+        self.aspiration = aspiration
+        self.aspirationWindow = aspirationWindow
+        self.killerMoves = killerMoves  # Try quiet moves that caused cutoffs at the same ply before other quiet moves
+
+class SearchStats:
+    """Counters describing how much work one search did"""
+
+    def __init__(self):
+        self.nodes = 0
+        self.interiorNodes = 0  # Nodes whose moves were searched
+        self.betaCutoffs = 0
+        self.firstMoveCutoffs = 0  # Cutoffs caused by the first move searched
+        self.killerCutoffs = 0  # Cutoffs caused by a quiet move already among the ply's killers
+        self.quietGenerations = 0  # Nodes that got as far as generating their quiet moves
+        self.depth = 0  # Deepest completed iteration
+        self.elapsed = 0.0
+        self.cacheProbes = {}  # Cache name -> lookups
+        self.cacheHits = {}  # Cache name -> lookups that found an entry
+        self.nullMoveTries = 0
+        self.nullMoveCutoffs = 0
+        self.nullMoveVerifyFails = 0  # Null-move cutoffs a verification search overturned
+        self.lmrReductions = 0
+        self.lmrResearches = 0  # Reduced moves that beat alpha and were searched again at full depth
+        self.futilityPrunes = 0
+        self.pvsResearches = 0  # Zero-window searches that failed high and were searched again
+        self.aspirationFailLows = 0
+        self.aspirationFailHighs = 0
+        self.iterations = []  # One record per completed iteration
+        self.stopReason = None  # 'depth', 'mate', 'soft time', 'hard time', 'nodes' or 'stopped'
+        self.startTime = time.perf_counter()
+
+    def probe(self, cache, hit):
+        self.cacheProbes[cache] = self.cacheProbes.get(cache, 0) + 1
+        if hit:
+            self.cacheHits[cache] = self.cacheHits.get(cache, 0) + 1
+
+    def hitRate(self, cache):
+        probes = self.cacheProbes.get(cache, 0)
+        return self.cacheHits.get(cache, 0) / probes if probes else 0.0
+
+    def nps(self):
+        return self.nodes / self.elapsed if self.elapsed > 0 else 0.0
+
+    def cutoffRate(self):
+        return self.betaCutoffs / self.interiorNodes if self.interiorNodes else 0.0
+
+    def firstMoveCutoffRatio(self):
+        return self.firstMoveCutoffs / self.betaCutoffs if self.betaCutoffs else 0.0
+
+    def branchingFactor(self):
+        """Effective branching factor: the depth-th root of the nodes searched"""
+        return self.nodes ** (1 / self.depth) if self.depth else 0.0
+
+    def finishIteration(self, depth, score, move):
+        self.depth = depth
+        self.elapsed = time.perf_counter() - self.startTime
+        previous = self.iterations[-1] if self.iterations else None
+        self.iterations.append({
+            'depth': depth,
+            'score': score,
+            'move': move,
+            'nodes': self.nodes - (previous['totalNodes'] if previous else 0),
+            'totalNodes': self.nodes,
+            'elapsed': self.elapsed - (previous['totalElapsed'] if previous else 0.0),
+            'totalElapsed': self.elapsed,
+        })
+
+    def asDict(self):
+        return {
+            'nodes': self.nodes,
+            'nps': round(self.nps()),
+            'depth': self.depth,
+            'elapsed': round(self.elapsed, 6),
+            'betaCutoffs': self.betaCutoffs,
+            'cutoffRate': round(self.cutoffRate(), 4),
+            'firstMoveCutoffRatio': round(self.firstMoveCutoffRatio(), 4),
+            'ebf': round(self.branchingFactor(), 3),
+            'killerCutoffs': self.killerCutoffs,
+            'quietGenerations': self.quietGenerations,
+            'nullMoveTries': self.nullMoveTries,
+            'nullMoveCutoffs': self.nullMoveCutoffs,
+            'nullMoveVerifyFails': self.nullMoveVerifyFails,
+            'lmrReductions': self.lmrReductions,
+            'lmrResearches': self.lmrResearches,
+            'futilityPrunes': self.futilityPrunes,
+            'pvsResearches': self.pvsResearches,
+            'aspirationFailLows': self.aspirationFailLows,
+            'aspirationFailHighs': self.aspirationFailHighs,
+            'cacheHitRates': {name: round(self.hitRate(name), 4) for name in self.cacheProbes},
+            'stopReason': self.stopReason,
+            'iterations': [dict(it, elapsed=round(it['elapsed'], 6), totalElapsed=round(it['totalElapsed'], 6))
+                           for it in self.iterations],
+        }
+
+class SearchResult:
+    """Best move found by a search, with its score, expected line and statistics"""
+
+    def __init__(self, piece, move, score, pv, stats):
+        self.piece = piece
+        self.move = move
+        self.score = score
+        self.pv = pv  # [(from, to), ...] starting with the best move
+        self.stats = stats
+
+    @property
+    def ponderMove(self):
+        """The reply the search expects, e.g. to think about on the opponent's time"""
+        return self.pv[1] if len(self.pv) > 1 else None
+
+class Searcher:
+    """Iterative deepening principal variation search with a transposition table
+
+    Each iteration searches the root in an aspiration window around the
+    previous score. Null-move pruning, late move reductions and futility
+    pruning cut down the hopeless lines; each can be switched off through
+    SearchOptions. A TimeManager decides when to stop deepening and when to
+    abandon the iteration in progress.
+
+    Below the root, moves are generated in stages as they are needed: the
+    transposition table's move, then captures, then killer moves, then the
+    other quiet moves. A cutoff in an early stage skips generating the rest.
+
+    The search is written as generators so it can be paused and resumed: with
+    cooperative set they yield at every node (see CooperativeSearch), and
+    search() simply runs them to the end.
+    """
+
+    def __init__(self, board, board_size='6x6', maxNodes=None, options=None, timeManager=None):
+        self.board = board
+        self.board_size = board_size
+        self.maxNodes = maxNodes  # Stop searching after this many nodes
+        self.timeManager = timeManager
+        self.deadline = timeManager.hardDeadline if timeManager is not None else None
+        self.stopRequested = False
+        self.onIteration = None  # Called with (depth, score, pv) after each finished iteration
+        self.cooperative = False  # Yield at every node, see searchSteps
+        self.options = options if options is not None else SearchOptions()
+        self.tt = {}  # position key -> (depth, score, bound, (from, to))
+        self.stats = SearchStats()
+        self.rootBest = None  # Best (score, (piece, move)) of the iteration in progress
+        self.pvTable = [[] for _ in range(MAX_PLY + 1)]  # Best line found from each ply
+        self.killers = [[None, None] for _ in range(MAX_PLY + 1)]  # Two quiet cutoff moves per ply
+
+    def search(self, color, maxDepth=DEPTH, rootMoves=None, randomize=True):
+        steps = self.searchSteps(color, maxDepth, rootMoves, randomize)
+        while True:
+            try:
+                next(steps)
+            except StopIteration as finished:
+                return finished.value
+
+    def searchSteps(self, color, maxDepth=DEPTH, rootMoves=None, randomize=True):
+        """search() as a generator, returning the SearchResult; yields at every node when cooperative"""
+        self.stats = SearchStats()
+        self.killers = [[None, None] for _ in range(MAX_PLY + 1)]
+        if rootMoves is None:
+            rootMoves = self.legalMoves(color)
+        if not rootMoves:
+            return SearchResult(None, None, None, [], self.stats)
+
+        # Shuffle first so equally good moves are chosen at random, then put
+        # captures and positionally promising moves first
+        rootMoves = list(rootMoves)
+        if randomize:
+            random.shuffle(rootMoves)
+        rootMoves.sort(key=lambda pm: -(self.captureScore(*pm) +
+                                        evaluatePosition(pm[0], pm[1], self.board_size, self.board)))
+
+        bestPiece, bestMove, bestScore = rootMoves[0][0], rootMoves[0][1], None
+        line = []
+        pawnProbes, pawnHits = PAWN_CACHE.probes, PAWN_CACHE.hits
+        for depth in range(1, maxDepth + 1):
+            if self.stopRequested:
+                self.stats.stopReason = 'stopped'
+                break
+            self.rootBest = None
+            try:
+                score, (piece, move) = yield from self.aspirationSearch(color, depth, rootMoves, bestScore)
+            except SearchAborted:
+                # Out of nodes or time, or stopped: keep the last full
+                # iteration, or whatever the first iteration found so far
+                if bestScore is None and self.rootBest is not None:
+                    bestScore, (bestPiece, bestMove) = self.rootBest
+                    line = [(bestPiece.position, bestMove)]
+                self.stats.elapsed = time.perf_counter() - self.stats.startTime
+                if self.stopRequested:
+                    self.stats.stopReason = 'stopped'
+                elif self.deadline is not None and self.timeManager.hardExpired():
+                    self.stats.stopReason = 'hard time'
+                else:
+                    self.stats.stopReason = 'nodes'
+                break
+            bestPiece, bestMove, bestScore = piece, move, score
+            line = self.pvTable[0]
+            self.stats.finishIteration(depth, score, [piece.position, move])
+            if self.onIteration is not None:
+                self.onIteration(depth, score, self.principalVariation(color, line))
+            # Search the best move first in the next iteration
+            rootMoves.remove((piece, move))
+            rootMoves.insert(0, (piece, move))
+            if abs(score) >= MATE_BOUND:
+                self.stats.stopReason = 'mate'
+                break  # Forced mate found, deeper search cannot improve it
+            if self.timeManager is not None and depth < maxDepth and \
+                    not self.timeManager.canDeepen(self.stats.iterations):
+                self.stats.stopReason = 'soft time'
+                break
+        else:
+            self.stats.stopReason = 'depth'
+
+        self.stats.cacheProbes['pawn'] = PAWN_CACHE.probes - pawnProbes
+        self.stats.cacheHits['pawn'] = PAWN_CACHE.hits - pawnHits
+        pv = self.principalVariation(color, line)
+        return SearchResult(bestPiece, bestMove, bestScore, pv, self.stats)
+
+    def stop(self):
+        """Ask a search running on another thread to finish; it returns its best move so far"""
+        self.stopRequested = True
+
+    def aspirationSearch(self, color, depth, rootMoves, previous):
+        """Search the root in a narrow window around the previous score, widening it on failure"""
+        if previous is None or depth < 2 or abs(previous) >= MATE_BOUND or not self.options.aspiration:
+            return (yield from self.searchRoot(color, depth, rootMoves, -CHECKMATE - 1, CHECKMATE + 1))
+        delta = self.options.aspirationWindow
+        alpha, beta = previous - delta, previous + delta
+        while True:
+            score, pair = yield from self.searchRoot(color, depth, rootMoves, alpha, beta)
+            if score <= alpha:
+                self.stats.aspirationFailLows += 1
+                alpha = -CHECKMATE - 1 if delta >= ASPIRATION_MAX else score - delta
+            elif score >= beta:
+                self.stats.aspirationFailHighs += 1
+                beta = CHECKMATE + 1 if delta >= ASPIRATION_MAX else score + delta
+            else:
+                return score, pair
+            delta *= 4
+
+    def searchRoot(self, color, depth, rootMoves, alpha, beta):
+        opponent = 'b' if color == 'w' else 'w'
+        self.stats.nodes += 1
+        self.stats.interiorNodes += 1
+        self.pvTable[0] = []
+        alphaOrig = alpha
+        best, bestPair = -CHECKMATE - 1, rootMoves[0]
+        for i, (piece, move) in enumerate(rootMoves):
+            origin = piece.position
+            self.board.make_move(piece, move)
+            try:
+                if i == 0:
+                    score = -(yield from self.negamax(opponent, depth - 1, -beta, -alpha, 1))
+                else:
+                    # Principal variation search: prove the move is no better
+                    # with a zero window, and search it properly only if it is
+                    score = -(yield from self.negamax(opponent, depth - 1, -alpha - 1, -alpha, 1))
+                    if alpha < score < beta:
+                        self.stats.pvsResearches += 1
+                        score = -(yield from self.negamax(opponent, depth - 1, -beta, -alpha, 1))
+            finally:
+                self.board.unmake_move()
+            if score > best:
+                best, bestPair = score, (piece, move)
+                self.rootBest = (best, bestPair)
+                self.pvTable[0] = [(origin, move)] + self.pvTable[1]
+            if best > alpha:
+                alpha = best
+                if alpha >= beta:
+                    break
+        bound = UPPER if best <= alphaOrig else LOWER if best >= beta else EXACT
+        self.storeTT(self.positionKey(color), depth, best, bound, (bestPair[0].position, bestPair[1]), 0)
+        return best, bestPair
+
+    def negamax(self, color, depth, alpha, beta, ply, allowNull=True):
+        if self.maxNodes is not None and self.stats.nodes >= self.maxNodes:
+            raise SearchAborted()
+        if not self.stats.nodes & TIME_CHECK_MASK and (
+                self.stopRequested or self.deadline is not None and time.perf_counter() >= self.deadline):
+            raise SearchAborted()
+        if self.cooperative:
+            yield  # Let a CooperativeSearch's caller pause the search at any node
+        self.stats.nodes += 1
+        alphaOrig = alpha
+        if ply >= MAX_PLY - 1:
+            return self.evaluate(color, ply)
+        self.pvTable[ply] = []
+
+        key = self.positionKey(color)
+        entry = self.tt.get(key)
+        self.stats.probe('tt', entry is not None)
+        ttMove = None
+        if entry is not None:
+            entryDepth, entryScore, bound, ttMove = entry
+            if entryDepth >= depth:
+                score = self.scoreFromTT(entryScore, ply)
+                if bound == EXACT:
+                    return score
+                if bound == LOWER:
+                    alpha = max(alpha, score)
+                elif bound == UPPER:
+                    beta = min(beta, score)
+                if alpha >= beta:
+                    return score
+
+        if depth <= 0:
+            return self.evaluate(color, ply)
+
+        options = self.options
+        opponent = 'b' if color == 'w' else 'w'
+        inCheck = self.board.is_check(color)
+
+        # Null move: let the opponent move twice; if we still beat beta, a
+        # real move would too
+        if (options.nullMove and allowNull and not inCheck and depth > options.nullMoveReduction
+                and beta < MATE_BOUND and self.nullMoveAllowed(color)):
+            self.stats.nullMoveTries += 1
+            reduced = depth - 1 - options.nullMoveReduction
+            score = -(yield from self.negamax(opponent, reduced, -beta, -beta + 1, ply + 1, False))
+            if score >= beta:
+                # Small boards are prone to zugzwang, where passing is the best
+                # move there is, so confirm with a real search of our own moves
+                if (options.nullMoveVerify and self.board.dimension < 8 and
+                        (yield from self.negamax(color, reduced, beta - 1, beta, ply, False)) < beta):
+                    self.stats.nullMoveVerifyFails += 1
+                else:
+                    self.stats.nullMoveCutoffs += 1
+                    self.pvTable[ply] = []
+                    return beta
+
+        # Futility: near the leaves, quiet moves cannot lift a hopeless position to alpha
+        futile = False
+        staticEval = None
+        margin = options.futilityMargins.get(depth) if options.futility else None
+        if margin is not None and not inCheck and abs(alpha) < MATE_BOUND:
+            staticEval = self.evaluate(color, ply)
+            futile = staticEval + margin <= alpha
+
+        best, bestMove = -CHECKMATE - 1, None
+        i = -1
+        for i, (piece, move) in enumerate(self.generateMoves(color, ttMove, ply)):
+            origin = piece.position
+            capture = self.board.get_piece_at(move) is not None
+            self.board.make_move(piece, move)
+            try:
+                if i == 0:
+                    score = -(yield from self.negamax(opponent, depth - 1, -beta, -alpha, ply + 1))
+                else:
+                    reduction = 0
+                    if not capture and (futile or (
+                            options.lateMoveReductions and i >= options.lmrFullDepthMoves and
+                            depth >= options.lmrMinDepth and not inCheck)):
+                        # Quiet moves that give check are never pruned or reduced
+                        if not self.board.is_check(opponent):
+                            if futile:
+                                self.stats.futilityPrunes += 1
+                                best = max(best, staticEval + margin)
+                                continue
+                            reduction = min(1 if i < 2 * options.lmrFullDepthMoves else 2, depth - 1)
+                    # Principal variation search: a zero window proves the move
+                    # is no better than alpha; only if that fails is it searched
+                    # again at full depth and then with the full window
+                    if reduction:
+                        self.stats.lmrReductions += 1
+                    score = -(yield from self.negamax(opponent, depth - 1 - reduction, -alpha - 1, -alpha, ply + 1))
+                    if reduction and score > alpha:
+                        self.stats.lmrResearches += 1
+                        score = -(yield from self.negamax(opponent, depth - 1, -alpha - 1, -alpha, ply + 1))
+                    if alpha < score < beta:
+                        self.stats.pvsResearches += 1
+                        score = -(yield from self.negamax(opponent, depth - 1, -beta, -alpha, ply + 1))
+            finally:
+                self.board.unmake_move()
+            if score > best:
+                best, bestMove = score, (origin, move)
+                if score > alpha:
+                    self.pvTable[ply] = [(origin, move)] + self.pvTable[ply + 1]
+            alpha = max(alpha, best)
+            if alpha >= beta:
+                self.stats.betaCutoffs += 1
+                if i == 0:
+                    self.stats.firstMoveCutoffs += 1
+                if not capture:
+                    if (origin, move) in self.killers[ply]:
+                        self.stats.killerCutoffs += 1
+                    self.addKiller(ply, (origin, move))
+                break
+
+        if i < 0:
+            # Checkmated (prefer the quickest mate) or stalemated
+            return -CHECKMATE + ply if inCheck else STALEMATE
+        self.stats.interiorNodes += 1
+        bound = UPPER if best <= alphaOrig else LOWER if best >= beta else EXACT
+        self.storeTT(key, depth, best, bound, bestMove, ply)
+        return best
+
+    def nullMoveAllowed(self, color):
+        """Zugzwang guard: the side to move needs pieces besides pawns to be able to pass"""
+        pieces = 0
+        hasOfficer = False
+        for piece in self.board.pieces:
+            if piece.color == color and piece.type != 'K':
+                pieces += 1
+                hasOfficer = hasOfficer or piece.type != 'P'
+        return hasOfficer and pieces >= NULL_MOVE_MIN_PIECES
+
+    def evaluate(self, color, ply):
+        key = (self.board_size, color, self.board.hash)
+        score = EVAL_CACHE.get(key)
+        self.stats.probe('eval', score is not None)
+        if score is None:
+            score = evaluateBoard(self.board, color, self.board_size)
+            EVAL_CACHE.put(key, score)
+        if score >= CHECKMATE:
+            return CHECKMATE - ply - 1  # The side to move has a mate in one
+        return score
+
+    def legalMoves(self, color):
+        moves = []
+        for piece in self.board.pieces:
+            if piece.color == color:
+                for move in self.board.get_valid_moves_considering_check(piece):
+                    target = self.board.get_piece_at(move)
+                    if not target or target.type != 'K':  # Never capture a king
+                        moves.append((piece, move))
+        return moves
+
+    def generateMoves(self, color, ttMove=None, ply=0):
+        """Yield color's legal moves in stages: table move, captures, killers, quiet moves
+
+        Each stage is generated only once the previous one has been used up,
+        so a node that cuts off early never generates its quiet moves. The
+        caller may make and unmake moves between items.
+        """
+        board = self.board
+        if ttMove is not None:
+            piece = board.get_piece_at(ttMove[0])
+            if (piece is None or piece.color != color or ttMove[1] not in piece.get_valid_moves(board)
+                    or self.capturesKing(ttMove[1]) or not board.is_legal(piece, ttMove[1])):
+                ttMove = None  # Stale entry, or a colliding position
+            else:
+                yield piece, ttMove[1]
+
+        # Captures, most valuable victim first
+        captures = [(piece, move) for piece, move in board.generate_captures(color)
+                    if (piece.position, move) != ttMove and not self.capturesKing(move)]
+        captures.sort(key=lambda pm: -self.captureScore(*pm))
+        for piece, move in captures:
+            if board.is_legal(piece, move):
+                yield piece, move
+
+        killers = ()
+        if self.options.killerMoves:
+            killers = [killer for killer in self.killers[ply] if killer is not None and killer != ttMove]
+            for origin, move in killers:
+                piece = board.get_piece_at(origin)
+                if (piece is not None and piece.color == color and move not in board.squares
+                        and move in piece.get_valid_moves(board) and board.is_legal(piece, move)):
+                    yield piece, move
+
+        self.stats.quietGenerations += 1
+        for piece, move in board.generate_quiet_moves(color):
+            pair = (piece.position, move)
+            if pair != ttMove and pair not in killers and board.is_legal(piece, move):
+                yield piece, move
+
+    def capturesKing(self, move):
+        target = self.board.get_piece_at(move)
+        return target is not None and target.type == 'K'  # Never capture a king
+
+    def addKiller(self, ply, move):
+        killers = self.killers[ply]
+        if killers[0] != move:
+            killers[1] = killers[0]
+            killers[0] = move
+
+    def captureScore(self, piece, move):
+        target = self.board.get_piece_at(move)
+        if not target:
+            return 0
+        return 1000 + 10 * CAPTURE_VALUES.get(target.type, 0) - CAPTURE_VALUES.get(piece.type, 0)
+
+    def positionKey(self, color):
+        return (color, self.board.hash)
+
+    def storeTT(self, key, depth, score, bound, move, ply):
+        if len(self.tt) >= TT_SIZE:
+            self.tt.clear()
+        self.tt[key] = (depth, self.scoreToTT(score, ply), bound, move)
+
+    def scoreToTT(self, score, ply):
+        # Store mate scores relative to this node rather than the root
+        if score >= MATE_BOUND:
+            return score + ply
+        if score <= -MATE_BOUND:
+            return score - ply
+        return score
+
+    def scoreFromTT(self, score, ply):
+        if score >= MATE_BOUND:
+            return score - ply
+        if score <= -MATE_BOUND:
+            return score + ply
+        return score
+
+    def principalVariation(self, color, line, maxLength=32):
+        """The search's best line, extended with best moves from the transposition table
+
+        The line can end early where a node was answered from the table, so
+        the table is followed from there for as long as its moves are legal.
+        """
+        pv = []
+        for origin, target in line:
+            self.board.make_move(self.board.get_piece_at(origin), target)
+            pv.append((origin, target))
+            color = 'b' if color == 'w' else 'w'
+        seen = set()
+        while len(pv) < maxLength:
+            key = self.positionKey(color)
+            entry = self.tt.get(key)
+            if entry is None or entry[3] is None or key in seen:
+                break
+            seen.add(key)
+            origin, target = entry[3]
+            mover = self.board.get_piece_at(origin)
+            if mover is None or mover.color != color or target not in self.board.get_valid_moves_considering_check(mover):
+                break
+            pv.append((origin, target))
+            self.board.make_move(mover, target)
+            color = 'b' if color == 'w' else 'w'
+        for _ in pv:
+            self.board.unmake_move()
+        return pv
+
+def search(board, color, board_size='6x6', depth=DEPTH, rootMoves=None, maxNodes=None, randomize=True,
+           options=None, timeManager=None):
+    """Search for color's best move; returns a SearchResult including the search statistics"""
+    return Searcher(board, board_size, maxNodes, options, timeManager).search(color, depth, rootMoves, randomize)
+
+def logSearchStats(stats, path=None, **fields):
+    """Append one search's statistics as a JSON line"""
+    path = path or STATS_LOG
+    if not path:
+        return
+    record = dict(fields, **stats.asDict())
+    with open(path, 'a') as f:
+        f.write(json.dumps(record) + '\n')
+
+def findBestMove(board, validMoves, board_size='6x6', timeManager=None):
+    """Find the best move that doesn't leave own king in check and doesn't capture opponent's king
+
+    Thinks for AI_MOVE_TIME unless given a TimeManager, and never answers
+    sooner than AI_MOVE_DELAY.
+    """
+    if timeManager is None:
+        timeManager = TimeManager(moveTime=AI_MOVE_TIME)
     
     if not validMoves:
         return None, None
-        
-    # Filter moves that would capture a king
-    filtered_moves = []
-    last_moved_pieces = []  # Track last moved pieces to avoid repetition
     
+    # Filter moves that would capture a king or leave own king in check
+    filtered_moves = []
     for piece, move in validMoves:
         target = board.get_piece_at(move)
         if not target or target.type != 'K':
-            # Simulate move to check if it leaves own king in check
-            original_pos = piece.position
-            if target:
-                board.pieces.remove(target)
-            piece.position = move
-            
+            board.make_move(piece, move)
             if not board.is_check(piece.color):
                 filtered_moves.append((piece, move))
-                
-            # Undo move simulation
-            piece.position = original_pos
-            if target:
-                board.pieces.append(target)
+            board.unmake_move()
     
     if not filtered_moves:
         return None, None
-        
-    # Select best move from filtered legal moves with piece diversity
-    best_moves = []
-    best_score = -CHECKMATE
-    
-    # Penalize moves that use recently moved pieces
-    piece_usage_penalty = 20  # Penalty for using same piece repeatedly
     
-    for piece, move in filtered_moves:
-        # Make move
-        original_pos = piece.position
-        target = board.get_piece_at(move)
-        piece.position = move
-        if target:
-            board.pieces.remove(target)
-            
-        # Base position evaluation
-        score = evaluateBoard(board, piece.color, board_size)
-        score += evaluatePosition(piece, move, board_size, board)
-        
-        # Penalize if piece was recently used
-        if piece in last_moved_pieces:
-            score -= piece_usage_penalty
-        
-        # Extra points for checking opponent's king
-        opponent_color = 'b' if piece.color == 'w' else 'w'
-        if board.is_check(opponent_color):
-            score += 50  # Bonus for check
-            if board.is_checkmate(opponent_color):
-                score = CHECKMATE  # Maximum score for checkmate
-        
-        # Bonus for moving different piece types
-        if piece.type in ['P', 'N', 'B', 'Q']:  # Encourage non-king piece movement
-            score += 10
-            
-        # Bonus for forward movement of pieces
-        if piece.type != 'K':  # Don't encourage king movement early
-            if piece.color == 'w' and move[0] < original_pos[0]:  # White moving forward
-                score += 5
-            elif piece.color == 'b' and move[0] > original_pos[0]:  # Black moving forward
-                score += 5
-        
-        # Small random factor to prevent deterministic play
-        score += random.uniform(-5, 5)
-        
-        # Undo move
-        piece.position = original_pos
-        if target:
-            board.pieces.append(target)
-            
-        if score > best_score:
-            best_score = score
-            best_moves = [(piece, move)]
-        elif score == best_score and random.random() < 0.4:  # 40% chance to add equal moves
-            best_moves.append((piece, move))
+    color = filtered_moves[0][0].color
+    result = Searcher(board, board_size, timeManager=timeManager).search(color, MAX_DEPTH, filtered_moves)
+    logSearchStats(result.stats, board_size=board_size, color=color, budget=round(timeManager.hard, 6),
+                   latency=round(timeManager.elapsed(), 6))
     
-    if not best_moves:
-        return None, None
-    
-    # Select random move from best moves
-    chosen_move = random.choice(best_moves)
-    # Update last moved pieces (keep track of last 3 moves)
-    last_moved_pieces.append(chosen_move[0])
-    if len(last_moved_pieces) > 3:
-        last_moved_pieces.pop(0)
-        
-    return chosen_move
+    # Add delay to match human pace
+    wait = AI_MOVE_DELAY - timeManager.elapsed()
+    if wait > 0:
+        time.sleep(wait)
+    return result.piece, result.move
+
+class CooperativeSearch:
+    """findBestMove for callers without a thread to spare, advanced by calling step()
+
+    Each step searches for about COOPERATIVE_SLICE seconds and returns, so
+    a game loop can keep drawing and handling input between steps on a
+    single thread. The time budget runs on the wall clock from creation, as
+    it does for findBestMove. Like a Future, done() turns true once the
+    search has finished and AI_MOVE_DELAY has passed, and result() then
+    gives the (piece, move) to play, or (None, None) without a legal move.
+    """
+
+    def __init__(self, board, color, board_size='6x6', timeManager=None):
+        self.board_size = board_size
+        self.color = color
+        self.timeManager = timeManager if timeManager is not None else TimeManager(moveTime=AI_MOVE_TIME)
+        self.searcher = Searcher(board, board_size, timeManager=self.timeManager)
+        self.searcher.cooperative = True
+        rootMoves = self.searcher.legalMoves(color)
+        self._steps = self.searcher.searchSteps(color, MAX_DEPTH, rootMoves) if rootMoves else None
+        self._result = None if rootMoves else SearchResult(None, None, None, [], self.searcher.stats)
+
+    def step(self, budget=COOPERATIVE_SLICE):
+        """Search for about budget seconds; returns True once the search has finished"""
+        if self._result is None:
+            end = time.perf_counter() + budget
+            try:
+                while time.perf_counter() < end:
+                    next(self._steps)
+            except StopIteration as finished:
+                self._result = finished.value
+                logSearchStats(self._result.stats, board_size=self.board_size, color=self.color,
+                               budget=round(self.timeManager.hard, 6), latency=round(self.timeManager.elapsed(), 6),
+                               cooperative=True)
+        return self._result is not None
+
+    def done(self):
+        return self._result is not None and self.timeManager.elapsed() >= AI_MOVE_DELAY
+
+    def result(self):
+        return self._result.piece, self._result.move
 
 def evaluatePosition(piece, move, board_size='6x6', board=None):
     score = 0
@@ -146,10 +835,8 @@ def evaluatePosition(piece, move, board_size='6x6', board=None):
             
         # Bonus for supported pawns (only if board is provided)
         if board:
-            for p in board.pieces:
-                if p.color == piece.color and p.type == 'P':
-                    if abs(p.position[1] - col) == 1:  # Adjacent columns
-                        score += 2
+            files = pawnStructure(board)[1][piece.color]
+            score += 2 * (files[col] + files[col + 2])  # Adjacent columns
                     
     elif piece.type == 'N':
         # Knights are more valuable near center
@@ -180,64 +867,134 @@ def evaluatePosition(piece, move, board_size='6x6', board=None):
     
     return score
 
-def evaluateBoard(board, color, board_size='6x6'):
-    score = 0
+def pawnStructure(board):
+    """Pawn terms for both sides, cached by pawn placement
+
+    Returns (connected pawns per color, pawns per file per color), where a
+    pawn counts once for every friendly pawn on an adjacent file. The file
+    counts are padded with an empty file on each side, so the files next to
+    column c are at c and c + 2.
+    """
+    key = (board.dimension, board.pawn_hash)
+    entry = PAWN_CACHE.get(key)
+    if entry is None:
+        files = {'w': [0] * (board.dimension + 2), 'b': [0] * (board.dimension + 2)}
+        for p in board.pieces:
+            if p.type == 'P':
+                files[p.color][p.position[1] + 1] += 1
+        connected = {color: sum(f[i] * (f[i - 1] + f[i + 1]) for i in range(1, board.dimension + 1))
+                     for color, f in files.items()}
+        entry = (connected, files)
+        PAWN_CACHE.put(key, entry)
+    return entry
+
+def squaresBetween(start, end, directions):
+    """Squares strictly between two squares on a line along one of the directions, else None"""
+    dr, dc = end[0] - start[0], end[1] - start[1]
+    if not (dr == 0 or dc == 0 or abs(dr) == abs(dc)) or (dr, dc) == (0, 0):
+        return None
+    step = ((dr > 0) - (dr < 0), (dc > 0) - (dc < 0))
+    if step not in directions:
+        return None
+    return [(start[0] + step[0] * i, start[1] + step[1] * i) for i in range(1, max(abs(dr), abs(dc)))]
+
+def attacksSquare(piece, square, target, board, vacated=None):
+    """Whether piece, standing on square, attacks target (with vacated treated as empty)"""
+    dr, dc = target[0] - square[0], target[1] - square[1]
+    if piece.type == 'N':
+        return (dr, dc) in KNIGHT_OFFSETS
+    if piece.type == 'K':
+        return (dr, dc) in KING_OFFSETS
+    if piece.type == 'P':
+        return dr == (-1 if piece.color == 'w' else 1) and abs(dc) == 1
+    directions = SLIDING_DIRECTIONS.get(piece.type)
+    if directions is None:
+        return False
+    between = squaresBetween(square, target, directions)
+    if between is None:
+        return False
+    squares = board.squares
+    return all(sq == vacated or sq not in squares for sq in between)
+
+def evaluationFeatures(board, color, board_size='6x6'):
+    """evaluateBoard's terms for color, in FEATURES order, or None when color can mate in one"""
     dim = int(board_size[0])
-    pieces = {
-        '4x4': {'B': 30, 'Q': 90, 'K': 900},
-        '6x6': {'P': 10, 'N': 30, 'B': 30, 'Q': 90, 'K': 900},
-        '8x8': {'P': 10, 'N': 30, 'B': 30, 'R': 50, 'Q': 90, 'K': 900}
-    }[board_size]
+    center = dim // 2
     
-    # Material score
+    # Material balance
+    material = dict.fromkeys('PNBRQK', 0)
     for piece in board.pieces:
-        value = pieces.get(piece.type, 0)
-        multiplier = 1 if piece.color == color else -1
-        score += value * multiplier
-        
-        # Position-based scores
-        if piece.color == color:
-            # Control of center
-            row, col = piece.position
-            center = dim // 2
-            if abs(row - center) <= 1 and abs(col - center) <= 1:
-                score += 5
-                
-            # Piece development
-            if piece.type in ['N', 'B', 'Q']:
-                if (color == 'w' and row < dim-1) or (color == 'b' and row > 0):
-                    score += 3
-                    
-            # Pawn structure
-            if piece.type == 'P':
-                # Connected pawns
-                for other in board.pieces:
-                    if other.color == color and other.type == 'P':
-                        if abs(other.position[1] - piece.position[1]) == 1:
-                            score += 2
-                            
-            # Attack potential
-            valid_moves = piece.get_valid_moves(board)
-            score += len(valid_moves) * 0.5  # Small bonus for mobility
+        material[piece.type] += 1 if piece.color == color else -1
+    
+    # Attack map: every friendly piece's moves, generated once
+    enemy_color = 'b' if color == 'w' else 'w'
+    own = [piece for piece in board.pieces if piece.color == color]
+    attacks = [(piece, piece.get_valid_moves(board)) for piece in own]
+    
+    # What already bears on the enemy king: pieces attacking it whatever moves
+    # (knights, kings and pawns), and sliders lined up with it, with the
+    # pieces standing in between
+    enemy_king = None
+    for piece in board.pieces:
+        if piece.type == 'K' and piece.color == enemy_color:
+            enemy_king = piece.position
+            break
+    fixed_checkers = []
+    lines = []
+    if enemy_king:
+        for piece in own:
+            if piece.type in SLIDING_DIRECTIONS:
+                between = squaresBetween(piece.position, enemy_king, SLIDING_DIRECTIONS[piece.type])
+                if between is not None:
+                    lines.append((piece, set(between), {sq for sq in between if sq in board.squares}))
+            elif attacksSquare(piece, piece.position, enemy_king, board):
+                fixed_checkers.append(piece)
+    
+    center_pieces = developed = mobility = checks = 0
+    for piece, valid_moves in attacks:
+        # Control of center
+        row, col = piece.position
+        if abs(row - center) <= 1 and abs(col - center) <= 1:
+            center_pieces += 1
             
-            # Check detection
-            enemy_color = 'b' if color == 'w' else 'w'
-            original_pos = piece.position
-            for move in valid_moves:
-                # Simulate move
-                target = board.get_piece_at(move)
-                piece.position = move
-                if target:
-                    board.pieces.remove(target)
-                    
-                if board.is_check(enemy_color):
-                    score += 20  # Big bonus for moves that give check
-                    if board.is_checkmate(enemy_color):
-                        score = CHECKMATE  # Maximum score for checkmate
-                        
-                # Undo move simulation
-                piece.position = original_pos
-                if target:
-                    board.pieces.append(target)
+        # Piece development
+        if piece.type in ['N', 'B', 'Q']:
+            if (color == 'w' and row < dim-1) or (color == 'b' and row > 0):
+                developed += 1
+                
+        # Attack potential
+        mobility += len(valid_moves)
+        
+        # Check detection: a move gives check if the piece attacks the king
+        # from its new square, or if any other piece does once this one has
+        # left its square (discovered check) and landed on the new one
+        if not enemy_king:
+            continue
+        origin = piece.position
+        others_check = any(checker is not piece for checker in fixed_checkers)
+        for move in valid_moves:
+            if move == enemy_king:
+                continue  # Taking the king leaves nothing to check
+            gives_check = others_check or attacksSquare(piece, move, enemy_king, board, vacated=origin)
+            if not gives_check:
+                for slider, between, blockers in lines:
+                    if slider is not piece and not (blockers - {origin}) and move not in between:
+                        gives_check = True
+                        break
+            if gives_check:
+                checks += 1
+                # Only a checking move can mate, so only these are played out
+                board.make_move(piece, move)
+                mate = board.is_checkmate(enemy_color)
+                board.unmake_move()
+                if mate:
+                    return None
     
-    return score
\ No newline at end of file
+    return [material['P'], material['N'], material['B'], material['R'], material['Q'], material['K'],
+            center_pieces, developed, mobility, checks, pawnStructure(board)[0][color]]
+
+def evaluateBoard(board, color, board_size='6x6'):
+    features = evaluationFeatures(board, color, board_size)
+    if features is None:
+        return CHECKMATE  # Maximum score for checkmate
+    return sum(weight * value for weight, value in zip(WEIGHTS[board_size], features))
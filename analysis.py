@@ -0,0 +1,153 @@
+"""Analyse a file of positions with the AI search in parallel worker processes.
+
+    python analysis.py positions [--depth N] [--nodes N] [--move-time S] [--workers N] [-o results.jsonl]
+
+Each input line is either a position in notation.py's FEN-style text or a
+JSON object holding a "fen", or the board as rows of engine-style squares
+plus the side to move; any "id" is copied to the result:
+
+    bqkb/4/4/BQKB w
+    {"id": "game7-ply12", "fen": "bqkb/4/2Q1/B1KB b"}
+    {"id": "game7-ply13", "turn": "b", "board": [["b_B", "b_Q", "b_K", "b_B"], ...]}
+
+A binary position file written by notation.RecordWriter is read through a
+memory map instead, and "line" is then the record number.
+
+Positions are read lazily and handed to the workers in chunks, with only a
+few chunks in flight per worker, so memory stays flat however long the input
+is. Results are written as JSON lines in the order they finish; "line" is the
+input line number. A position that cannot be read or searched produces a
+result with an "error" field instead of stopping the run.
+"""
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from ai import DEPTH, MAX_DEPTH, TimeManager, search
+from notation import MAGIC, RecordFile, board_from_fen, decode_record, grid_to_fen, move_to_text
+from rules import Board
+
+CHUNK_SIZE = 32  # Positions sent to a worker at a time
+CHUNKS_PER_WORKER = 2  # Chunks queued per worker before reading more input
+
+
+def analyse_position(record: Dict, depth: int = DEPTH, nodes: Optional[int] = None,
+                     move_time: Optional[float] = None) -> Dict:
+    """Search one position record and describe the result; with a move time, deepen until it runs out"""
+    if 'fen' in record:
+        board, turn = board_from_fen(record['fen'])
+    else:
+        board = Board.from_grid(record['board'])
+        turn = record.get('turn', 'w')
+    if turn not in ('w', 'b'):
+        raise ValueError(f"turn must be 'w' or 'b', got {turn!r}")
+    time_manager = TimeManager(moveTime=move_time) if move_time else None
+    result = search(board, turn, board.size, depth=MAX_DEPTH if move_time else depth, maxNodes=nodes,
+                    randomize=False, timeManager=time_manager)
+    stats = result.stats
+    return {
+        'score': result.score,
+        'best': move_to_text((result.piece.position, result.move), board.dimension) if result.move else None,
+        'pv': [move_to_text(move, board.dimension) for move in result.pv],
+        'depth': stats.depth,
+        'nodes': stats.nodes,
+        'elapsed': round(stats.elapsed, 6),
+    }
+
+
+def _analyse_chunk(chunk: List[Tuple[int, str]], depth: int, nodes: Optional[int],
+                   move_time: Optional[float]) -> List[Dict]:
+    """Runs in a worker process: analyse (line number, JSON or FEN text) pairs"""
+    results = []
+    for line_number, text in chunk:
+        output = {'line': line_number}
+        try:
+            text = text.strip()
+            record = json.loads(text) if text.startswith('{') else {'fen': text}
+            if 'id' in record:
+                output['id'] = record['id']
+            output.update(analyse_position(record, depth, nodes, move_time))
+        except Exception as e:
+            output['error'] = f"{type(e).__name__}: {e}"
+        results.append(output)
+    return results
+
+
+def _chunks(lines: Iterable[str], size: int) -> Iterator[List[Tuple[int, str]]]:
+    chunk = []
+    for line_number, text in enumerate(lines, 1):
+        if not text.strip():
+            continue
+        chunk.append((line_number, text))
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def analyse_stream(lines: Iterable[str], depth: int = DEPTH, nodes: Optional[int] = None,
+                   workers: Optional[int] = None, chunk_size: int = CHUNK_SIZE,
+                   move_time: Optional[float] = None) -> Iterator[Dict]:
+    """Analyse position lines in worker processes, yielding results as they finish"""
+    workers = workers or os.cpu_count() or 1
+    max_pending = workers * CHUNKS_PER_WORKER
+    chunks = _chunks(lines, chunk_size)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = set()
+        for chunk in chunks:
+            pending.add(pool.submit(_analyse_chunk, chunk, depth, nodes, move_time))
+            if len(pending) >= max_pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield from future.result()
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield from future.result()
+
+
+def read_lines(path: str) -> Iterator[str]:
+    """Input lines from a text file, stdin ('-') or a binary position file"""
+    if path == '-':
+        yield from sys.stdin
+        return
+    with open(path, 'rb') as f:
+        binary = f.read(len(MAGIC)) == MAGIC
+    if binary:
+        with RecordFile(path) as records:
+            for record in records:
+                yield grid_to_fen(*decode_record(record, records.dimension))
+                record.release()
+    else:
+        with open(path) as f:
+            yield from f
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('positions', help="position file (text or binary), or - for stdin")
+    parser.add_argument('--depth', type=int, default=DEPTH, help="search depth in plies")
+    parser.add_argument('--nodes', type=int, help="node budget per position")
+    parser.add_argument('--move-time', type=float, metavar='S',
+                        help="seconds per position, deepening until they run out (overrides --depth)")
+    parser.add_argument('--workers', type=int, help="worker processes (default: one per core)")
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help="positions per worker task")
+    parser.add_argument('-o', '--output', help="results file (default: stdout)")
+    args = parser.parse_args()
+
+    output = open(args.output, 'w') if args.output else sys.stdout
+    try:
+        for result in analyse_stream(read_lines(args.positions), args.depth, args.nodes,
+                                     args.workers, args.chunk_size, args.move_time):
+            output.write(json.dumps(result) + '\n')
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+from typing import List, Optional, Set, Tuple
+
+import pygame
+
+ANIMATION_MS = 400  # Time for a piece to slide to its destination
+
+
+class MoveAnimation:
+    """A sprite sliding between two screen positions over a fixed time.
+
+    ``square`` is the board square the piece lands on; the board renderer
+    hides the piece there until the animation finishes. ``captured`` is an
+    optional sprite left on the destination until the mover arrives.
+    """
+
+    def __init__(self, image: pygame.Surface, start: Tuple[float, float], end: Tuple[float, float],
+                 started_at: int, duration: int = ANIMATION_MS,
+                 square: Optional[Tuple[int, int]] = None,
+                 captured: Optional[pygame.Surface] = None):
+        self.image = image
+        self.start = start
+        self.end = end
+        self.started_at = started_at
+        self.duration = max(1, duration)
+        self.square = square
+        self.captured = captured
+
+    def progress(self, now: int) -> float:
+        return min(1.0, max(0.0, (now - self.started_at) / self.duration))
+
+    def position(self, now: int) -> Tuple[float, float]:
+        alpha = self.progress(now)
+        return (self.start[0] + (self.end[0] - self.start[0]) * alpha,
+                self.start[1] + (self.end[1] - self.start[1]) * alpha)
+
+    def is_finished(self, now: int) -> bool:
+        return now - self.started_at >= self.duration
+
+
+class Animator:
+    """Advances any number of overlapping move animations from the main loop.
+
+    Nothing here blocks: each frame the loop calls ``update`` with the current
+    time, repaints whatever lies under the rectangles it returns, and then
+    calls ``draw`` to put the sprites back on top.
+    """
+
+    def __init__(self):
+        self.animations: List[MoveAnimation] = []
+        self._drawn_rects: List[pygame.Rect] = []  # Sprite rectangles on screen right now
+
+    @property
+    def active(self) -> bool:
+        return bool(self.animations)
+
+    def start(self, animation: MoveAnimation):
+        self.animations.append(animation)
+
+    def clear(self):
+        self.animations.clear()
+        self._drawn_rects.clear()
+
+    def hidden_squares(self) -> Set[Tuple[int, int]]:
+        return {a.square for a in self.animations if a.square is not None}
+
+    def update(self, now: int) -> List[pygame.Rect]:
+        """Drop finished animations and return the rectangles the sprites covered last frame"""
+        self.animations = [a for a in self.animations if not a.is_finished(now)]
+        stale, self._drawn_rects = self._drawn_rects, []
+        return stale
+
+    def draw(self, surface: pygame.Surface, now: int) -> List[pygame.Rect]:
+        """Draw every sprite at its current position and return the rectangles drawn"""
+        for animation in self.animations:
+            if animation.captured is not None:
+                rect = animation.captured.get_rect(topleft=animation.end)
+                surface.blit(animation.captured, rect)
+                self._drawn_rects.append(rect)
+        for animation in self.animations:
+            rect = animation.image.get_rect(topleft=animation.position(now))
+            surface.blit(animation.image, rect)
+            self._drawn_rects.append(rect)
+        return list(self._drawn_rects)
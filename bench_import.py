@@ -0,0 +1,63 @@
+"""Measure how long it takes a fresh interpreter to import the game modules.
+
+    python bench_import.py [--runs N]
+
+Each module set is imported in a new subprocess so nothing is cached between
+runs. The headless set (rules + AI) must not pull in pygame; the script
+exits non-zero if it does.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+CASES = [
+    ("rules + ai (headless)", "import rules, ai"),
+    ("main (GUI, not started)", "import main"),
+]
+
+PROBE = """
+import sys, time
+start = time.perf_counter()
+{imports}
+elapsed = time.perf_counter() - start
+print(elapsed, 'pygame' in sys.modules)
+"""
+
+
+def time_import(imports: str) -> tuple:
+    """Import in a fresh interpreter; returns (seconds, whether pygame got imported)"""
+    env = dict(os.environ, PYGAME_HIDE_SUPPORT_PROMPT='1')
+    result = subprocess.run([sys.executable, '-c', PROBE.format(imports=imports)],
+                            cwd=SCRIPT_DIR, env=env, capture_output=True, text=True, check=True)
+    elapsed, pygame_loaded = result.stdout.split()[-2:]
+    return float(elapsed), pygame_loaded == 'True'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=10, help='imports to time per case')
+    args = parser.parse_args()
+
+    ok = True
+    for name, imports in CASES:
+        samples = []
+        pygame_loaded = False
+        for _ in range(args.runs):
+            elapsed, loaded = time_import(imports)
+            samples.append(elapsed * 1000)
+            pygame_loaded = pygame_loaded or loaded
+        print(f"{name:26} median {statistics.median(samples):7.1f} ms   "
+              f"min {min(samples):7.1f} ms   pygame imported: {pygame_loaded}")
+        if 'headless' in name and pygame_loaded:
+            ok = False
+    if not ok:
+        print("error: the headless modules imported pygame", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+"""Pack the piece sprites, pre-scaled for every board size, into one texture atlas.
+
+    python build_atlas.py [--images DIR] [--output DIR] [--screen WIDTHxHEIGHT ...]
+
+The square size of each board (4x4, 6x6, 8x8) is worked out with main.py's
+own layout code for the full window, or for each --screen resolution, and
+every piece is scaled to that size exactly as renderer.py would scale it.
+The sprites of each size are laid side by side in a strip, and the strips
+are written one after another to atlas.rgba as raw RGBA pixels, with an
+atlas.json index of where each strip and sprite is. The original sprites
+are packed too, so a square size missing from the atlas (a smaller
+screen) is still scaled from them at runtime.
+
+renderer.BoardRenderer uses the atlas when it finds it in its image
+directory: the strip for the board being drawn is one read with nothing to
+decode or scale. mini_chess.spec runs this before bundling and ships only the
+atlas; the loose images are still used when running from source.
+"""
+import argparse
+import json
+import os
+from typing import Dict, Iterable, List, Tuple
+
+import pygame
+
+from renderer import ATLAS_IMAGE, ATLAS_INDEX, IMAGE_DIR, PIECE_SCALE
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+OUTPUT_DIR = os.path.join(SCRIPT_DIR, 'build', 'atlas')
+PIECE_NAMES = [f"{color}_{type}" for color in 'wb' for type in 'PNBRQK']
+
+Rect = Tuple[int, int, int, int]
+
+
+def square_sizes(screens: Iterable[Tuple[int, int]]) -> List[int]:
+    """Square sizes main.py lays the boards out with on these screens, largest first"""
+    import main  # Only for its layout code; the window is never opened
+    sizes = set()
+    for width, height in screens:
+        main.update_screen_size(width, height)
+        for board_size in main.BOARD_SIZES:
+            main.updateBoardSize(board_size)
+            sizes.add(main.SQ_SIZE)
+    return sorted(sizes, reverse=True)
+
+
+def build_atlas(image_dir: str = IMAGE_DIR, output_dir: str = OUTPUT_DIR,
+                screens: Iterable[Tuple[int, int]] = ()) -> str:
+    """Write atlas.rgba and atlas.json to output_dir; returns the index path"""
+    screens = list(screens)
+    if not screens:
+        from main import WINDOW_HEIGHT, WINDOW_WIDTH
+        screens = [(WINDOW_WIDTH, WINDOW_HEIGHT)]
+    sources = {name: pygame.image.load(os.path.join(image_dir, f"{name}.png")) for name in PIECE_NAMES}
+
+    # One strip of twelve sprites side by side for the originals, then one per square size
+    strips: List[Tuple[str, Dict[str, pygame.Surface]]] = [('source', sources)]
+    for sq_size in square_sizes(screens):
+        size = int(sq_size * PIECE_SCALE)
+        strips.append((str(sq_size), {name: pygame.transform.scale(image, (size, size))
+                                      for name, image in sources.items()}))
+
+    os.makedirs(output_dir, exist_ok=True)
+    index: Dict[str, dict] = {}
+    with open(os.path.join(output_dir, ATLAS_IMAGE), 'wb') as f:
+        for key, sprites in strips:
+            width = sum(image.get_width() for image in sprites.values())
+            height = max(image.get_height() for image in sprites.values())
+            strip = pygame.Surface((width, height), pygame.SRCALPHA)
+            rects: Dict[str, Rect] = {}
+            x = 0
+            for name, image in sprites.items():
+                strip.blit(image, (x, 0))
+                rects[name] = (x, 0, image.get_width(), image.get_height())
+                x += image.get_width()
+            index[key] = {'offset': f.tell(), 'size': (width, height), 'sprites': rects}
+            f.write(pygame.image.tobytes(strip, 'RGBA'))
+
+    index_path = os.path.join(output_dir, ATLAS_INDEX)
+    with open(index_path, 'w') as f:
+        json.dump({'image': ATLAS_IMAGE, 'strips': index}, f, separators=(',', ':'))
+        f.write('\n')
+    return index_path
+
+
+def parse_screen(text: str) -> Tuple[int, int]:
+    try:
+        width, height = (int(part) for part in text.lower().split('x'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected WIDTHxHEIGHT, got {text!r}")
+    return width, height
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--images', default=IMAGE_DIR, help="directory of the piece sprites")
+    parser.add_argument('--output', default=OUTPUT_DIR, help="directory to write atlas.rgba and atlas.json to")
+    parser.add_argument('--screen', action='append', type=parse_screen, metavar='WIDTHxHEIGHT',
+                        help="screen resolution to lay out for (repeat for several; default: the full window)")
+    args = parser.parse_args()
+    index_path = build_atlas(args.images, args.output, args.screen or ())
+    with open(index_path) as f:
+        sizes = [strip for strip in json.load(f)['strips'] if strip != 'source']
+    print(f"wrote {os.path.join(args.output, ATLAS_IMAGE)} with square sizes {', '.join(sizes)}")
+
+
+if __name__ == '__main__':
+    main()
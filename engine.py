@@ -1,4 +1,8 @@
+from rules import MOVE_TABLES
+
 class Move():
+    notationMaps = {}  # dimension -> (ranksToRows, rowsToRanks, filesToCols, colsToFiles), shared by all moves
+
     # Convert board coordinates to chess notation
     def __init__(self, startSq, endSq, board, dimension=6):
         self.startRow = startSq[0]
@@ -16,10 +20,14 @@ class Move():
             self.isPawnPromotion = True
 
         # Update ranks and files based on dimension
-        self.ranksToRows = {str(i + 1): self.dimension - 1 - i for i in range(self.dimension)}
-        self.rowsToRanks = {v: k for k, v in self.ranksToRows.items()}
-        self.filesToCols = {chr(ord('a') + i): i for i in range(self.dimension)}
-        self.colsToFiles = {v: k for k, v in self.filesToCols.items()}
+        maps = Move.notationMaps.get(dimension)
+        if maps is None:
+            ranksToRows = {str(i + 1): dimension - 1 - i for i in range(dimension)}
+            filesToCols = {chr(ord('a') + i): i for i in range(dimension)}
+            maps = (ranksToRows, {v: k for k, v in ranksToRows.items()},
+                    filesToCols, {v: k for k, v in filesToCols.items()})
+            Move.notationMaps[dimension] = maps
+        self.ranksToRows, self.rowsToRanks, self.filesToCols, self.colsToFiles = maps
 
     def __eq__(self, other):
         if isinstance(other, Move):
@@ -33,8 +41,12 @@ class Move():
         return self.colsToFiles[c] + self.rowsToRanks[r]
 
 class GameState():
+    bishopDirections = ((-1, -1), (-1, 1), (1, -1), (1, 1))
+    rookDirections = ((-1, 0), (0, -1), (1, 0), (0, 1))
+
     def __init__(self, dimension=6):
         self.dimension = dimension
+        self.moveTables = MOVE_TABLES[dimension]  # Target squares from every square, precomputed
         # Initialize empty board
         self.board = [['--' for _ in range(dimension)] for _ in range(dimension)]
         
@@ -73,9 +85,6 @@ class GameState():
             self.whiteKingLocation = (7, 4)
             self.blackKingLocation = (0, 4)
             
-        # Debug: Print initial board setup and king locations
-        self.printBoardState()
-        
         # Move functions
         self.moveFunctions = {
             'P': self.getPawnMoves,
@@ -90,6 +99,9 @@ class GameState():
         self.moveLog = []
         self.checkMate = False
         self.staleMate = False
+
+        # Debug: Print initial board setup and king locations
+        self.printBoardState()
         
     def printBoardState(self):
         print(f"\nCurrent board state ({self.dimension}x{self.dimension}):")
@@ -175,15 +187,26 @@ class GameState():
 
     def squareUnderAttack(self, position):
         self.whiteToMove = not self.whiteToMove
-        oppMoves = self.getAllPossibleMoves()
-        self.whiteToMove = not self.whiteToMove
-        for move in oppMoves:
-            if move.endRow == position[0] and move.endCol == position[1]:
-                print(f"Square {position} is under attack by move {move.getChessNotation()}")
-                return True
+        try:
+            # Stop at the first attacker instead of generating every opponent move
+            for move in self.generatePossibleMoves():
+                if move.endRow == position[0] and move.endCol == position[1]:
+                    print(f"Square {position} is under attack by move {move.getChessNotation()}")
+                    return True
+        finally:
+            self.whiteToMove = not self.whiteToMove
         return False
 
     def getAllPossibleMoves(self):
+        return list(self.generatePossibleMoves())
+
+    def generatePossibleMoves(self):
+        """Yield the side to move's moves one piece at a time, ignoring checks
+
+        Only the current piece's moves are generated before they are handed
+        out, so a caller that stops early skips the other pieces. The board
+        must be the same whenever the next move is asked for.
+        """
         moves = []
         for r in range(self.dimension):
             for c in range(self.dimension):
@@ -191,71 +214,42 @@ class GameState():
                 if (turn == 'w' and self.whiteToMove) or (turn == 'b' and not self.whiteToMove):
                     piece = self.board[r][c][2]
                     self.moveFunctions[piece](r, c, moves)
-        return moves
+                    yield from moves
+                    moves.clear()
 
     def getPawnMoves(self, r, c, moves):
-        if self.whiteToMove:
-            if r > 0:
-                if self.board[r-1][c] == "--":
-                    moves.append(Move((r, c), (r-1, c), self.board, self.dimension))
-                if c-1 >= 0 and self.board[r-1][c-1][0] == 'b':
-                    moves.append(Move((r, c), (r-1, c-1), self.board, self.dimension))
-                if c+1 < self.dimension and self.board[r-1][c+1][0] == 'b':
-                    moves.append(Move((r, c), (r-1, c+1), self.board, self.dimension))
-        else:
-            if r < self.dimension - 1:
-                if self.board[r+1][c] == "--":
-                    moves.append(Move((r, c), (r+1, c), self.board, self.dimension))
-                if c-1 >= 0 and self.board[r+1][c-1][0] == 'w':
-                    moves.append(Move((r, c), (r+1, c-1), self.board, self.dimension))
-                if c+1 < self.dimension and self.board[r+1][c+1][0] == 'w':
-                    moves.append(Move((r, c), (r+1, c+1), self.board, self.dimension))
+        color, enemyColor = ('w', 'b') if self.whiteToMove else ('b', 'w')
+        push = self.moveTables.pawn_push[color][(r, c)]
+        if push is not None and self.board[push[0]][push[1]] == "--":
+            moves.append(Move((r, c), push, self.board, self.dimension))
+        for endRow, endCol in self.moveTables.pawn_captures[color][(r, c)]:
+            if self.board[endRow][endCol][0] == enemyColor:
+                moves.append(Move((r, c), (endRow, endCol), self.board, self.dimension))
 
     def getKnightMoves(self, r, c, moves):
-        knightMoves = ((-2, -1), (-2, 1), (-1, -2), (-1, 2), (1, -2), (1, 2), (2, -1), (2, 1))
         allyColor = 'w' if self.whiteToMove else 'b'
-        for m in knightMoves:
-            endRow, endCol = r + m[0], c + m[1]
-            if 0 <= endRow < self.dimension and 0 <= endCol < self.dimension:
-                endPiece = self.board[endRow][endCol]
-                if endPiece[0] != allyColor:
-                    moves.append(Move((r, c), (endRow, endCol), self.board, self.dimension))
+        for endRow, endCol in self.moveTables.knight[(r, c)]:
+            endPiece = self.board[endRow][endCol]
+            if endPiece[0] != allyColor:
+                moves.append(Move((r, c), (endRow, endCol), self.board, self.dimension))
 
     def getBishopMoves(self, r, c, moves):
-        directions = ((-1, -1), (-1, 1), (1, -1), (1, 1))
-        enemyColor = 'b' if self.whiteToMove else 'w'
-        for d in directions:
-            for i in range(1, self.dimension):
-                endRow = r + d[0] * i
-                endCol = c + d[1] * i
-                if 0 <= endRow < self.dimension and 0 <= endCol < self.dimension:
-                    endPiece = self.board[endRow][endCol]
-                    if endPiece == "--":
-                        moves.append(Move((r, c), (endRow, endCol), self.board, self.dimension))
-                    elif endPiece[0] == enemyColor:
-                        moves.append(Move((r, c), (endRow, endCol), self.board, self.dimension))
-                        break
-                    else:
-                        break
-                else:
-                    break
+        self.getSlidingMoves(r, c, self.bishopDirections, moves)
 
     def getRookMoves(self, r, c, moves):
-        directions = ((-1, 0), (0, -1), (1, 0), (0, 1))
+        self.getSlidingMoves(r, c, self.rookDirections, moves)
+
+    def getSlidingMoves(self, r, c, directions, moves):
         enemyColor = 'b' if self.whiteToMove else 'w'
+        rays = self.moveTables.rays[(r, c)]
         for d in directions:
-            for i in range(1, self.dimension):
-                endRow = r + d[0] * i
-                endCol = c + d[1] * i
-                if 0 <= endRow < self.dimension and 0 <= endCol < self.dimension:
-                    endPiece = self.board[endRow][endCol]
-                    if endPiece == "--":
-                        moves.append(Move((r, c), (endRow, endCol), self.board, self.dimension))
-                    elif endPiece[0] == enemyColor:
-                        moves.append(Move((r, c), (endRow, endCol), self.board, self.dimension))
-                        break
-                    else:
-                        break
+            for endRow, endCol in rays[d]:
+                endPiece = self.board[endRow][endCol]
+                if endPiece == "--":
+                    moves.append(Move((r, c), (endRow, endCol), self.board, self.dimension))
+                elif endPiece[0] == enemyColor:
+                    moves.append(Move((r, c), (endRow, endCol), self.board, self.dimension))
+                    break
                 else:
                     break
 
@@ -264,11 +258,8 @@ class GameState():
         self.getRookMoves(r, c, moves)
 
     def getKingMoves(self, r, c, moves):
-        kingMoves = ((-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1))
         allyColor = 'w' if self.whiteToMove else 'b'
-        for m in kingMoves:
-            endRow, endCol = r + m[0], c + m[1]
-            if 0 <= endRow < self.dimension and 0 <= endCol < self.dimension:
-                endPiece = self.board[endRow][endCol]
-                if endPiece[0] != allyColor:
-                    moves.append(Move((r, c), (endRow, endCol), self.board, self.dimension))
\ No newline at end of file
+        for endRow, endCol in self.moveTables.king[(r, c)]:
+            endPiece = self.board[endRow][endCol]
+            if endPiece[0] != allyColor:
+                moves.append(Move((r, c), (endRow, endCol), self.board, self.dimension))
\ No newline at end of file
@@ -1,15 +1,21 @@
 import pygame
-import os
+import argparse
+import atexit
 import sys
 import random
 import time
+from concurrent.futures import ThreadPoolExecutor
 from pygame import mixer
-from typing import List, Tuple, Optional
+from typing import AbstractSet, Dict, List, Set, Tuple, Optional
 from enum import Enum, auto
 
-# Initialize Pygame and Mixer
-pygame.init()
-mixer.init()
+from animation import Animator, MoveAnimation
+from profiler import FrameProfiler
+from records import GameRecord, GameWriter
+from renderer import BoardRenderer
+from rules import Board, Piece
+from scheduler import IdleScheduler, wait_for_click
+from sounds import SoundBank
 
 class GameState(Enum):
     MENU = auto()
@@ -18,28 +24,37 @@ class GameState(Enum):
     PAUSED = auto()
     ENDED = auto()
 
-# Screen Setup
-display_info = pygame.display.Info()
-SCREEN_WIDTH: int = min(1366, display_info.current_w)
-SCREEN_HEIGHT: int = min(768, display_info.current_h)
-
-# UI Scaling based on screen resolution
-BASE_SCALE = min(SCREEN_WIDTH / 1366, SCREEN_HEIGHT / 768)
-SCALE_FACTOR: float = BASE_SCALE
-
 # Game Constants
 FPS = 60  # Frames per second
 WINDOW_WIDTH = 1366
 WINDOW_HEIGHT = 768
-BUTTON_WIDTH = int(120 * SCALE_FACTOR)
-BUTTON_HEIGHT = int(40 * SCALE_FACTOR)
-BUTTON_GAP = int(20 * SCALE_FACTOR)
-BUTTON_RADIUS = int(15 * SCALE_FACTOR)
 
-# UI Constants
-UI_LEFT_SPACE: int = int(SCREEN_WIDTH * 0.1)  # Increased side margins
-UI_TOP_SPACE: int = int(SCREEN_HEIGHT * 0.1)  # Increased top margin
-UI_BOTTOM_SPACE: int = int(SCREEN_HEIGHT * 0.1)  # Increased bottom margin
+def update_screen_size(width: int, height: int):
+    """Scale the UI to the screen resolution"""
+    global SCREEN_WIDTH, SCREEN_HEIGHT, BASE_SCALE, SCALE_FACTOR
+    global BUTTON_WIDTH, BUTTON_HEIGHT, BUTTON_GAP, BUTTON_RADIUS
+    global UI_LEFT_SPACE, UI_TOP_SPACE, UI_BOTTOM_SPACE
+    
+    # Screen Setup
+    SCREEN_WIDTH = min(WINDOW_WIDTH, width)
+    SCREEN_HEIGHT = min(WINDOW_HEIGHT, height)
+    
+    # UI Scaling based on screen resolution
+    BASE_SCALE = min(SCREEN_WIDTH / WINDOW_WIDTH, SCREEN_HEIGHT / WINDOW_HEIGHT)
+    SCALE_FACTOR = BASE_SCALE
+    
+    BUTTON_WIDTH = int(120 * SCALE_FACTOR)
+    BUTTON_HEIGHT = int(40 * SCALE_FACTOR)
+    BUTTON_GAP = int(20 * SCALE_FACTOR)
+    BUTTON_RADIUS = int(15 * SCALE_FACTOR)
+    
+    # UI Constants
+    UI_LEFT_SPACE = int(SCREEN_WIDTH * 0.1)  # Increased side margins
+    UI_TOP_SPACE = int(SCREEN_HEIGHT * 0.1)  # Increased top margin
+    UI_BOTTOM_SPACE = int(SCREEN_HEIGHT * 0.1)  # Increased bottom margin
+
+# Until the display is opened, lay out for the full window size
+update_screen_size(WINDOW_WIDTH, WINDOW_HEIGHT)
 
 def updateBoardSize(size: str):
     global DIMENSION_X, DIMENSION_Y, SQ_SIZE, BOARD_LEFT, BOARD_TOP
@@ -61,10 +76,10 @@ def updateBoardSize(size: str):
         available_width *= 0.95   # 95% of available width
     
     # Use the smaller dimension to ensure board fits
-    SQ_SIZE = min(
+    SQ_SIZE = int(min(
         available_width // DIMENSION_X,
         available_height // DIMENSION_Y
-    )
+    ))
     
     # Center the board both horizontally and vertically
     BOARD_LEFT = (SCREEN_WIDTH - (DIMENSION_X * SQ_SIZE)) // 2
@@ -82,8 +97,6 @@ BLUE = pygame.Color('#4a90e2')
 GREEN = pygame.Color('#50C878')
 RED = pygame.Color('#FF6B6B')
 BACKGROUND = pygame.Color('#F0F0F0')
-BOARD_LIGHT = pygame.Color('#F0D9B5')
-BOARD_DARK = pygame.Color('#B58863')
 
 def show_checkmate_message(winner):
     overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
@@ -101,41 +114,22 @@ def show_checkmate_message(winner):
     WINDOW.blit(continue_text, continue_rect)
     pygame.display.update()
     
-    try:
-        checkmate_sound = load_sound('checkmate_sound.wav')
-        checkmate_sound.play()
-    except:
-        print("Warning: Could not load checkmate sound")
-    
-    # Wait for click
-    waiting = True
-    while waiting:
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                pygame.quit()
-                sys.exit()
-            if event.type == pygame.MOUSEBUTTONDOWN:
-                waiting = False
-
-def load_sound(filename: str) -> mixer.Sound:
-    """Load a sound file from the audios directory"""
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    sound_path = os.path.join(script_dir, 'audios', filename)
-    return mixer.Sound(sound_path)
+    SOUNDS.play('checkmate')
+    
+    # Sleep until clicked
+    if not wait_for_click():
+        pygame.quit()
+        sys.exit()
 
 def transition_to_menu():
-    global current_state, CURRENT_TURN, selected_piece, valid_moves
+    global current_state, CURRENT_TURN, selected_piece, valid_moves, legal_moves
     current_state = GameState.MENU
     CURRENT_TURN = 'w'
     selected_piece = None
-    valid_moves = []
-    # Play transition sound
-    try:
-        sound = load_sound('Chess Sound Effects.wav')
-        sound.play()
-    except:
-        print("Warning: Could not load transition sound")
-        pass  # If sound file doesn't exist, skip it
+    valid_moves = frozenset()
+    legal_moves = {}
+    # Play transition sound (skipped if the file doesn't exist)
+    SOUNDS.play('transition')
 
 # Game State Variables
 current_state = GameState.MENU
@@ -144,15 +138,37 @@ selected_size = None
 white_player = "HUMAN"  # or "AI"
 black_player = "HUMAN"  # or "AI"
 
-# Initialize Window
-WINDOW = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
-pygame.display.set_caption("Mini Chess")
-clock = pygame.time.Clock()
+# Window, fonts and sounds are created by init_gui() when the GUI starts
+WINDOW: Optional[pygame.Surface] = None
+FONT: Optional[pygame.font.Font] = None
+TITLE_FONT: Optional[pygame.font.Font] = None
+SOUNDS: Optional[SoundBank] = None
+
+# Runs frames only while something animates, otherwise sleeps until an event
+SCHEDULER = IdleScheduler(FPS)
+
+# Board drawing with a cached checkerboard and per-square dirty tracking
+RENDERER = BoardRenderer()
+hud_state = None  # (turn, in check) shown in the strip above the board
+
+# Piece slides advanced by the main loop, several may overlap
+ANIMATOR = Animator()
 
-# Font
-pygame.font.init()
-FONT = pygame.font.Font(None, 36)
-TITLE_FONT = pygame.font.Font(None, 72)
+# The AI searches on its own thread so animations and input keep running
+AI_EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix='ai')
+ai_job = None  # (future, board, turn) for the search in progress
+AI_DONE_EVENT = pygame.event.custom_type()  # Posted by the AI thread to wake the main loop
+# With --cooperative the search runs on the main thread instead, a slice per frame
+AI_COOPERATIVE = False
+game_result = None  # ('draw', None) or ('checkmate', winner), shown once animations finish
+
+# Moves of the game in progress, appended to the --record file when it ends
+move_log: List[Tuple[Tuple[int, int], Tuple[int, int]]] = []
+GAME_WRITER: Optional[GameWriter] = None
+
+# Per-phase frame timing, enabled with --profile or toggled with F3
+PROFILER = FrameProfiler()
+PROFILE_KEY = pygame.K_F3
 
 class Button:
     def __init__(self, x, y, width, height, text, color=BLUE, hover_color=GREEN):
@@ -186,245 +202,29 @@ SELECTED_BOARD_SIZE: str = "6x6"
 # Calculate initial square size
 updateBoardSize(SELECTED_BOARD_SIZE)
 
-# Chess Board
-class Piece:
-    def __init__(self, color: str, type: str, position: Tuple[int, int]):
-        self.color = color  # 'w' or 'b'
-        self.type = type    # 'P', 'N', 'B', 'Q', 'K'
-        self.position = position
-
-    def get_valid_moves(self, board: 'Board') -> List[Tuple[int, int]]:
-        moves = []
-        row, col = self.position
-
-        if self.type == 'P':
-            direction = -1 if self.color == 'w' else 1
-            # Move forward
-            new_row = row + direction
-            if 0 <= new_row < DIMENSION_Y and not board.get_piece_at((new_row, col)):
-                moves.append((new_row, col))
-            # Capture diagonally
-            for dc in [-1, 1]:
-                new_col = col + dc
-                if 0 <= new_row < DIMENSION_Y and 0 <= new_col < DIMENSION_X:
-                    target = board.get_piece_at((new_row, new_col))
-                    if target and target.color != self.color:
-                        moves.append((new_row, new_col))
-        elif self.type == 'N':
-            knight_moves = [(-2, -1), (-2, 1), (-1, -2), (-1, 2), (1, -2), (1, 2), (2, -1), (2, 1)]
-            for dr, dc in knight_moves:
-                new_row, new_col = row + dr, col + dc
-                if 0 <= new_row < DIMENSION_Y and 0 <= new_col < DIMENSION_X:
-                    target = board.get_piece_at((new_row, new_col))
-                    if not target or target.color != self.color:
-                        moves.append((new_row, new_col))
-        elif self.type == 'B':
-            # Diagonals
-            directions = [(-1, -1), (-1, 1), (1, -1), (1, 1)]
-            for dr, dc in directions:
-                r, c = row, col
-                while True:
-                    r += dr
-                    c += dc
-                    if 0 <= r < DIMENSION_Y and 0 <= c < DIMENSION_X:
-                        target = board.get_piece_at((r, c))
-                        if not target:
-                            moves.append((r, c))
-                        elif target.color != self.color:
-                            moves.append((r, c))
-                            break
-                        else:
-                            break
-                    else:
-                        break
-        elif self.type == 'Q':
-            # Horizontal, Vertical, and Diagonal
-            directions = [(-1, 0), (1, 0), (0, -1), (0, 1), (-1, -1), (-1, 1), (1, -1), (1, 1)]
-            for dr, dc in directions:
-                r, c = row, col
-                while True:
-                    r += dr
-                    c += dc
-                    if 0 <= r < DIMENSION_Y and 0 <= c < DIMENSION_X:
-                        target = board.get_piece_at((r, c))
-                        if not target:
-                            moves.append((r, c))
-                        elif target.color != self.color:
-                            moves.append((r, c))
-                            break
-                        else:
-                            break
-                    else:
-                        break
-        elif self.type == 'K':
-            # One square in any direction
-            directions = [(-1, 0), (1, 0), (0, -1), (0, 1), (-1, -1), (-1, 1), (1, -1), (1, 1)]
-            for dr, dc in directions:
-                new_row, new_col = row + dr, col + dc
-                if 0 <= new_row < DIMENSION_Y and 0 <= new_col < DIMENSION_X:
-                    target = board.get_piece_at((new_row, new_col))
-                    if not target or target.color != self.color:
-                        moves.append((new_row, new_col))
-        return moves
-
-class Board:
-    def __init__(self):
-        self.pieces: List[Piece] = []
-        self.setup_board()
-
-    def setup_board(self):
-        self.pieces.clear()
-        # Adjust setup based on board size
-        if SELECTED_BOARD_SIZE == "4x4":
-            # New 4x4 setup with Bishops instead of Pawns
-            self.pieces.append(Piece('b', 'B', (0, 0)))
-            self.pieces.append(Piece('b', 'Q', (0, 1)))
-            self.pieces.append(Piece('b', 'K', (0, 2)))
-            self.pieces.append(Piece('b', 'B', (0, 3)))
-            self.pieces.append(Piece('w', 'B', (3, 0)))
-            self.pieces.append(Piece('w', 'Q', (3, 1)))
-            self.pieces.append(Piece('w', 'K', (3, 2)))
-            self.pieces.append(Piece('w', 'B', (3, 3)))
-        elif SELECTED_BOARD_SIZE == "6x6":
-            # Setup as per logs
-            self.pieces.append(Piece('b', 'N', (0, 0)))
-            self.pieces.append(Piece('b', 'B', (0, 1)))
-            self.pieces.append(Piece('b', 'Q', (0, 2)))
-            self.pieces.append(Piece('b', 'K', (0, 3)))
-            self.pieces.append(Piece('b', 'B', (0, 4)))
-            self.pieces.append(Piece('b', 'N', (0, 5)))
-            for i in range(6):
-                self.pieces.append(Piece('b', 'P', (1, i)))
-            for i in range(6):
-                self.pieces.append(Piece('w', 'P', (4, i)))
-            self.pieces.append(Piece('w', 'N', (5, 0)))
-            self.pieces.append(Piece('w', 'B', (5, 1)))
-            self.pieces.append(Piece('w', 'Q', (5, 2)))
-            self.pieces.append(Piece('w', 'K', (5, 3)))
-            self.pieces.append(Piece('w', 'B', (5, 4)))
-            self.pieces.append(Piece('w', 'N', (5, 5)))
-        elif SELECTED_BOARD_SIZE == "8x8":
-            # Standard chess setup
-            self.pieces.append(Piece('b', 'R', (0, 0)))
-            self.pieces.append(Piece('b', 'N', (0, 1)))
-            self.pieces.append(Piece('b', 'B', (0, 2)))
-            self.pieces.append(Piece('b', 'Q', (0, 3)))
-            self.pieces.append(Piece('b', 'K', (0, 4)))
-            self.pieces.append(Piece('b', 'B', (0, 5)))
-            self.pieces.append(Piece('b', 'N', (0, 6)))
-            self.pieces.append(Piece('b', 'R', (0, 7)))
-            for i in range(8):
-                self.pieces.append(Piece('b', 'P', (1, i)))
-            for i in range(8):
-                self.pieces.append(Piece('w', 'P', (6, i)))
-            self.pieces.append(Piece('w', 'R', (7, 0)))
-            self.pieces.append(Piece('w', 'N', (7, 1)))
-            self.pieces.append(Piece('w', 'B', (7, 2)))
-            self.pieces.append(Piece('w', 'Q', (7, 3)))
-            self.pieces.append(Piece('w', 'K', (7, 4)))
-            self.pieces.append(Piece('w', 'B', (7, 5)))
-            self.pieces.append(Piece('w', 'N', (7, 6)))
-            self.pieces.append(Piece('w', 'R', (7, 7)))
-
-    def get_piece_at(self, position: Tuple[int, int]) -> Optional[Piece]:
-        for piece in self.pieces:
-            if piece.position == position:
-                return piece
-        return None
-
-    def move_piece(self, piece: Piece, new_pos: Tuple[int, int]):
-        target = self.get_piece_at(new_pos)
-        if target:
-            self.pieces.remove(target)  # Capture
-        piece.position = new_pos
-
-    def is_check(self, color: str) -> bool:
-        king_pos = None
-        for piece in self.pieces:
-            if piece.color == color and piece.type == 'K':
-                king_pos = piece.position
-                break
-        if not king_pos:
-            return False
-
-        opponent_color = 'b' if color == 'w' else 'w'
-        for piece in self.pieces:
-            if piece.color == opponent_color:
-                valid_moves = piece.get_valid_moves(self)
-                if king_pos in valid_moves:
-                    return True
-        return False
-
-    def is_checkmate(self, color: str) -> bool:
-        if not self.is_check(color):
-            return False
-        # Check if ANY piece can make a move to get out of check
-        for piece in self.pieces:
-            if piece.color == color:
-                valid_moves = piece.get_valid_moves(self)
-                for move in valid_moves:
-                    # Simulate move
-                    original_pos = piece.position
-                    target = self.get_piece_at(move)
-                    piece.position = move
-                    if target:
-                        self.pieces.remove(target)
-                    in_check = self.is_check(color)
-                    # Undo move
-                    piece.position = original_pos
-                    if target:
-                        self.pieces.append(target)
-                    if not in_check:
-                        return False
-        return True
-
-    def get_valid_moves_considering_check(self, piece: Piece) -> List[Tuple[int, int]]:
-        """Get valid moves that don't leave the king in check"""
-        moves = piece.get_valid_moves(self)
-        valid_moves = []
-        
-        # Test each move
-        for move in moves:
-            # Simulate move
-            original_pos = piece.position
-            target = self.get_piece_at(move)
-            piece.position = move
-            if target:
-                self.pieces.remove(target)
-                
-            # If move doesn't leave king in check, it's valid
-            if not self.is_check(piece.color):
-                valid_moves.append(move)
-                
-            # Undo move
-            piece.position = original_pos
-            if target:
-                self.pieces.append(target)
-                
-        return valid_moves
-
-    def is_draw(self) -> bool:
-        """Check if the game is a draw (only kings left or stalemate)"""
-        # Check if only kings remain
-        if len(self.pieces) == 2:
-            kings = [p for p in self.pieces if p.type == 'K']
-            if len(kings) == 2:
-                return True
-                
-        # Check for stalemate (no legal moves but not in check)
-        current_color = 'w' if CURRENT_TURN == 'w' else 'b'
-        if not self.is_check(current_color):
-            has_legal_moves = False
-            for piece in self.pieces:
-                if piece.color == current_color:
-                    valid_moves = self.get_valid_moves_considering_check(piece)
-                    if valid_moves:
-                        has_legal_moves = True
-                        break
-            if not has_legal_moves:
-                return True
-        
-        return False
+def init_gui():
+    """Initialize pygame, open the window and load fonts and sounds"""
+    global WINDOW, FONT, TITLE_FONT, SOUNDS
+    
+    # Initialize Pygame and Mixer
+    pygame.init()
+    mixer.init()
+    
+    display_info = pygame.display.Info()
+    update_screen_size(display_info.current_w, display_info.current_h)
+    updateBoardSize(SELECTED_BOARD_SIZE)
+    
+    # Initialize Window
+    WINDOW = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+    pygame.display.set_caption("Mini Chess")
+    
+    # Font
+    pygame.font.init()
+    FONT = pygame.font.Font(None, 36)
+    TITLE_FONT = pygame.font.Font(None, 72)
+    
+    # Sound effects, decoded once in the background
+    SOUNDS = SoundBank(background=True)
 
 def show_draw_message():
     """Display draw message when game ends in a draw"""
@@ -448,73 +248,38 @@ def show_draw_message():
     WINDOW.blit(continue_text, continue_rect)
     pygame.display.update()
     
-    # Wait for click
-    waiting = True
-    while waiting:
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                pygame.quit()
-                sys.exit()
-            if event.type == pygame.MOUSEBUTTONDOWN:
-                waiting = False
-
-# Board and Game Variables
-board: Board = Board()
+    # Sleep until clicked
+    if not wait_for_click():
+        pygame.quit()
+        sys.exit()
+
+# Board and Game Variables (the board is created once a size is chosen)
+board: Optional[Board] = None
 selected_piece: Optional[Piece] = None
-valid_moves: List[Tuple[int, int]] = []
+valid_moves: AbstractSet[Tuple[int, int]] = frozenset()  # Targets of the selected piece, highlighted
+legal_moves: Dict[Tuple[int, int], Set[Tuple[int, int]]] = {}  # Human side to move: square -> targets
 
 def load_piece_image(piece: Piece) -> pygame.Surface:
-    # Get the directory where the script is located
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    piece_dir = os.path.join(script_dir, 'images')
-    piece_name = f"{piece.color}_{piece.type}.png"
-    piece_path = os.path.join(piece_dir, piece_name)
-    
-    if not os.path.exists(piece_path):
-        print(f"Error: Piece image not found: {piece_path}")
-        raise FileNotFoundError(f"Piece image not found: {piece_path}")
-    
-    image = pygame.image.load(piece_path)
-    return pygame.transform.scale(image, (int(SQ_SIZE * 0.8), int(SQ_SIZE * 0.8)))
-
-def draw_board(WINDOW: pygame.Surface):
-    colors = [BOARD_LIGHT, BOARD_DARK]
-    for row in range(DIMENSION_Y):
-        for col in range(DIMENSION_X):
-            color = colors[(row + col) % 2]
-            x = BOARD_LEFT + col * SQ_SIZE
-            y = BOARD_TOP + row * SQ_SIZE
-            pygame.draw.rect(WINDOW, color, (x, y, SQ_SIZE, SQ_SIZE))
-            
-            # Highlight valid moves
-            if (row, col) in valid_moves:
-                s = 5  # Border thickness
-                pygame.draw.rect(WINDOW, RED, (x+s, y+s, SQ_SIZE-2*s, SQ_SIZE-2*s), 3)
-            
-            # Highlight king in check or checkmate
-            piece = board.get_piece_at((row, col))
-            if piece and piece.type == 'K':
-                if board.is_check(piece.color):
-                    # Draw red background for check
-                    check_surface = pygame.Surface((SQ_SIZE, SQ_SIZE))
-                    check_surface.set_alpha(128)  # Semi-transparent
-                    check_surface.fill(RED)
-                    WINDOW.blit(check_surface, (x, y))
-                    # Draw "CHECK!" text above the board
-                    check_text = FONT.render("CHECK!", True, RED)
-                    text_rect = check_text.get_rect(center=(SCREEN_WIDTH//2, BOARD_TOP - 30))
-                    WINDOW.blit(check_text, text_rect)
-                elif board.is_checkmate(piece.color):
-                    # Solid red for checkmate
-                    pygame.draw.rect(WINDOW, RED, (x, y, SQ_SIZE, SQ_SIZE), 0)
-
-def draw_pieces(WINDOW: pygame.Surface):
-    for piece in board.pieces:
-        row, col = piece.position
-        piece_image = load_piece_image(piece)
-        x = BOARD_LEFT + col * SQ_SIZE + (SQ_SIZE - piece_image.get_width()) // 2
-        y = BOARD_TOP + row * SQ_SIZE + (SQ_SIZE - piece_image.get_height()) // 2
-        WINDOW.blit(piece_image, (x, y))
+    return RENDERER.piece_image(piece.color, piece.type, SQ_SIZE)
+
+_check_cache = (None, [])  # ((Zobrist hash, side to move), squares of kings in check)
+
+def check_squares() -> List[Tuple[int, int]]:
+    """Squares of kings in check, recomputed only when the position changes"""
+    global _check_cache
+    key = (board.hash, CURRENT_TURN)
+    if key != _check_cache[0]:
+        with PROFILER.phase('check'):
+            checked = [piece.position for piece in board.pieces
+                       if piece.type == 'K' and board.is_check(piece.color)]
+        _check_cache = (key, checked)
+    return _check_cache[1]
+
+def draw_board(WINDOW: pygame.Surface) -> List[pygame.Rect]:
+    """Repaint the squares whose piece, move highlight or check overlay changed"""
+    return RENDERER.render(WINDOW, board.pieces, DIMENSION_X, BOARD_LEFT, BOARD_TOP, SQ_SIZE,
+                           highlights=valid_moves, checked=check_squares(),
+                           hidden=ANIMATOR.hidden_squares())
 
 def draw_menu():
     # Draw title
@@ -582,212 +347,339 @@ def draw_player_select():
     return buttons
 
 def draw_game():
-    global selected_piece, valid_moves, current_state, CURRENT_TURN
+    global selected_piece, valid_moves, current_state, CURRENT_TURN, hud_state
     
     # Draw game state
-    draw_board(WINDOW)
-    draw_pieces(WINDOW)
-    
-    # Draw current turn indicator
-    turn_text = f"{'White' if CURRENT_TURN == 'w' else 'Black'}'s Turn"
-    turn_surf = FONT.render(turn_text, True, BLACK)
-    turn_rect = turn_surf.get_rect(midtop=(SCREEN_WIDTH//2, 10))
-    WINDOW.blit(turn_surf, turn_rect)
+    dirty_rects = draw_board(WINDOW)
     
-    # Draw menu button
     menu_button = Button(10, 10, BUTTON_WIDTH, BUTTON_HEIGHT, "Menu", RED)
-    menu_button.draw(WINDOW)
     
-    return [("MENU", menu_button)]
+    # Redraw the strip above the board only when the turn or check status changes
+    in_check = bool(check_squares())
+    if (CURRENT_TURN, in_check) != hud_state:
+        hud_state = (CURRENT_TURN, in_check)
+        hud_rect = pygame.Rect(0, 0, SCREEN_WIDTH, BOARD_TOP)
+        WINDOW.fill(BACKGROUND, hud_rect)
+        
+        # Draw current turn indicator
+        turn_text = f"{'White' if CURRENT_TURN == 'w' else 'Black'}'s Turn"
+        turn_surf = FONT.render(turn_text, True, BLACK)
+        turn_rect = turn_surf.get_rect(midtop=(SCREEN_WIDTH//2, 10))
+        WINDOW.blit(turn_surf, turn_rect)
+        
+        # Draw "CHECK!" text above the board
+        if in_check:
+            check_text = FONT.render("CHECK!", True, RED)
+            text_rect = check_text.get_rect(center=(SCREEN_WIDTH//2, BOARD_TOP - 30))
+            WINDOW.blit(check_text, text_rect)
+        
+        # Draw menu button
+        menu_button.draw(WINDOW)
+        dirty_rects.append(hud_rect)
+    
+    return [("MENU", menu_button)], dirty_rects
 
-def animate_human_move(surface, start_pos, end_pos, piece, board):
-    """Animate the movement of a piece"""
-    # Calculate pixel coordinates
+def animate_move(start_pos, end_pos, piece, captured=None):
+    """Start sliding a piece that has already been moved on the board"""
     piece_image = load_piece_image(piece)
-    start_x = BOARD_LEFT + start_pos[1] * SQ_SIZE + (SQ_SIZE - piece_image.get_width()) // 2
-    start_y = BOARD_TOP + start_pos[0] * SQ_SIZE + (SQ_SIZE - piece_image.get_height()) // 2
-    end_x = BOARD_LEFT + end_pos[1] * SQ_SIZE + (SQ_SIZE - piece_image.get_width()) // 2
-    end_y = BOARD_TOP + end_pos[0] * SQ_SIZE + (SQ_SIZE - piece_image.get_height()) // 2
-
-    steps = 20  # Number of animation frames
-    
-    # Animate the movement
-    for i in range(steps + 1):
-        # Calculate current position
-        alpha = i / steps
-        current_x = start_x + (end_x - start_x) * alpha
-        current_y = start_y + (end_y - start_y) * alpha
-        
-        # Redraw everything
-        draw_board(surface)
-        draw_pieces(surface)
-        surface.blit(piece_image, (current_x, current_y))
-        pygame.display.update()
-        pygame.time.delay(20)  # Add a small delay for smooth animation
-
-def main():
+    
+    def topleft(pos):
+        return (BOARD_LEFT + pos[1] * SQ_SIZE + (SQ_SIZE - piece_image.get_width()) // 2,
+                BOARD_TOP + pos[0] * SQ_SIZE + (SQ_SIZE - piece_image.get_height()) // 2)
+    
+    captured_image = load_piece_image(captured) if captured else None
+    ANIMATOR.start(MoveAnimation(piece_image, topleft(start_pos), topleft(end_pos),
+                                 pygame.time.get_ticks(), square=end_pos, captured=captured_image))
+
+def update_legal_moves():
+    """Work out a human side to move's legal moves once per turn, so clicks only look them up"""
+    global legal_moves
+    if game_result is None and (
+        (CURRENT_TURN == 'w' and white_player == "HUMAN") or
+        (CURRENT_TURN == 'b' and black_player == "HUMAN")):
+        with PROFILER.phase('rules'):
+            legal_moves = board.legal_move_map(CURRENT_TURN)
+    else:
+        legal_moves = {}
+
+def play_move(piece: Piece, move: Tuple[int, int]):
+    """Make a move, start its animation and record whether it ended the game"""
+    global CURRENT_TURN, game_result
+    start_pos = piece.position
+    captured = board.get_piece_at(move)
+    board.move_piece(piece, move)
+    move_log.append((start_pos, move))
+    animate_move(start_pos, move, piece, captured)
+    SOUNDS.play('move')
+    CURRENT_TURN = 'b' if CURRENT_TURN == 'w' else 'w'
+    
+    # Check game ending conditions
+    with PROFILER.phase('rules'):
+        if board.is_draw(CURRENT_TURN):
+            print("Game Drawn!")
+            game_result = ('draw', None)
+        elif board.is_check(CURRENT_TURN):
+            SOUNDS.play('check')
+            if board.is_checkmate(CURRENT_TURN):
+                winner = 'White' if CURRENT_TURN == 'b' else 'Black'
+                game_result = ('checkmate', winner)
+    update_legal_moves()
+
+def record_game(result: str):
+    """Write the game in progress to the --record file and start a new move log"""
+    if GAME_WRITER is not None and move_log:
+        GAME_WRITER.write(GameRecord(SELECTED_BOARD_SIZE, white_player, black_player, result, list(move_log)))
+    move_log.clear()
+
+def search_ai_move(search_board: Board, color: str, board_size: str):
+    """Runs on the AI thread: generate the legal moves and pick one"""
+    from ai import findBestMove
+    all_moves = []
+    for piece in search_board.pieces:
+        if piece.color == color:
+            moves = search_board.get_valid_moves_considering_check(piece)
+            all_moves.extend([(piece, move) for move in moves])
+    if not all_moves:
+        return None, None
+    return findBestMove(search_board, all_moves, board_size)
+
+def wake_main_loop(_future):
+    """Called on the AI thread when a search finishes"""
+    try:
+        pygame.event.post(pygame.event.Event(AI_DONE_EVENT))
+    except pygame.error:
+        pass  # The window was closed while the AI was thinking
+
+def start_ai_search():
+    """Search a copy of the board on the AI thread, or in slices on this one, returning the job"""
+    if AI_COOPERATIVE:
+        from ai import CooperativeSearch
+        return (CooperativeSearch(board.copy(), CURRENT_TURN, SELECTED_BOARD_SIZE), board, CURRENT_TURN)
+    future = AI_EXECUTOR.submit(search_ai_move, board.copy(), CURRENT_TURN, SELECTED_BOARD_SIZE)
+    future.add_done_callback(wake_main_loop)
+    return (future, board, CURRENT_TURN)
+
+def main(profile: bool = False, profile_csv: Optional[str] = None, search_log: Optional[str] = None,
+         record: Optional[str] = None, move_time: Optional[float] = None, weights: Optional[str] = None,
+         cooperative: bool = False):
     global current_state, board, selected_piece, valid_moves, selected_size
     global white_player, black_player, DIMENSION_X, DIMENSION_Y, SELECTED_BOARD_SIZE, CURRENT_TURN
+    global hud_state, ai_job, game_result, GAME_WRITER, AI_COOPERATIVE
+    
+    if WINDOW is None:
+        init_gui()
+    
+    if search_log or move_time or weights:
+        import ai
+        if search_log:
+            ai.STATS_LOG = search_log
+        if move_time:
+            ai.AI_MOVE_TIME = move_time
+        if weights:
+            ai.loadWeights(weights)
+    
+    AI_COOPERATIVE = cooperative
+    
+    if record:
+        GAME_WRITER = GameWriter(record)
+        atexit.register(GAME_WRITER.close)  # The result dialogs may exit directly
+    
+    PROFILER.csv_path = profile_csv
+    if profile or profile_csv:
+        PROFILER.enable()
+    overlay_font = pygame.font.SysFont('monospace', 14)
     
     running = True
     buttons = []
     CURRENT_TURN = 'w'  # White starts
-    gameOver = False  # Initialize gameOver variable
+    drawn_state = None  # Screen shown on the previous frame
 
     while running:
-        WINDOW.fill(BACKGROUND)
-        clock.tick(FPS)
+        PROFILER.begin_frame()
+        
+        # Sleep until an event arrives unless a piece is sliding, a result is due
+        # or a cooperative search needs frames to run in
+        with PROFILER.phase('wait'):
+            events = SCHEDULER.next_events(ANIMATOR.active or game_result is not None or
+                                           (AI_COOPERATIVE and ai_job is not None))
         
-        # Draw current state
-        if current_state == GameState.MENU:
-            buttons = draw_menu()
-        elif current_state == GameState.PLAYER_SELECT:
-            buttons = draw_player_select()
-        elif current_state == GameState.GAME:
-            buttons = draw_game()
-            
-            # Handle AI moves
-            if ((CURRENT_TURN == 'w' and white_player == "AI") or 
-                (CURRENT_TURN == 'b' and black_player == "AI")):
-                if not gameOver and current_state == GameState.GAME:
-                    from ai import findBestMove
-                    valid_moves = []
-                    
-                    all_moves = []
-                    for piece in board.pieces:
-                        if piece.color == CURRENT_TURN:
-                            moves = board.get_valid_moves_considering_check(piece)
-                            all_moves.extend([(piece, move) for move in moves])
-                    
-                    if all_moves:
-                        piece, move = findBestMove(board, all_moves, SELECTED_BOARD_SIZE)
-                        if piece and move:
-                            start_pos = piece.position
-                            board.move_piece(piece, move)
-                            # Animate AI move
-                            animate_human_move(WINDOW, start_pos, move, piece, board)
-                            try:
-                                move_sound = load_sound('move_pieces.wav')
-                                move_sound.play()
-                            except:
-                                print("Warning: Could not load move sound")
-                            CURRENT_TURN = 'b' if CURRENT_TURN == 'w' else 'w'
-                            
-                            # Check game ending conditions
-                            if board.is_draw():
-                                print("Game Drawn!")
-                                show_draw_message()
-                                transition_to_menu()
-                            elif board.is_check(CURRENT_TURN):
-                                try:
-                                    check_sound = load_sound('move_pieces.wav')
-                                    check_sound.play()
-                                except:
-                                    print("Warning: Could not load check sound")
-                                if board.is_checkmate(CURRENT_TURN):
-                                    winner = 'White' if CURRENT_TURN == 'b' else 'Black'
-                                    show_checkmate_message(winner)
-                                    transition_to_menu()
-
         # Event Handling
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                running = False
+        with PROFILER.phase('events'):
+            for event in events:
+                if event.type == pygame.QUIT:
+                    running = False
+            
+                if event.type == pygame.KEYDOWN and event.key == PROFILE_KEY:
+                    PROFILER.toggle()
+                    drawn_state = None  # Repaint everything to add or remove the overlay
                 
-            if event.type == pygame.MOUSEBUTTONDOWN:
-                mouse_pos = event.pos
+                if event.type == pygame.MOUSEBUTTONDOWN:
+                    mouse_pos = event.pos
                 
-                # Handle button clicks
-                if current_state == GameState.MENU:
-                    for i, button in enumerate(buttons):
-                        if button.rect.collidepoint(mouse_pos):
-                            selected_size = BOARD_SIZES[i]
-                            SELECTED_BOARD_SIZE = selected_size
-                            updateBoardSize(selected_size)
-                            board = Board()  # Reset board with new size
-                            current_state = GameState.PLAYER_SELECT
+                    # Handle button clicks
+                    if current_state == GameState.MENU:
+                        for i, button in enumerate(buttons):
+                            if button.rect.collidepoint(mouse_pos):
+                                selected_size = BOARD_SIZES[i]
+                                SELECTED_BOARD_SIZE = selected_size
+                                updateBoardSize(selected_size)
+                                board = Board(selected_size)  # Reset board with new size
+                                current_state = GameState.PLAYER_SELECT
                 
-                elif current_state == GameState.PLAYER_SELECT:
-                    for button_id, button in buttons:
-                        if button.rect.collidepoint(mouse_pos):
-                            if button_id == "WHITE_HUMAN":
-                                white_player = "HUMAN"
-                            elif button_id == "WHITE_AI":
-                                white_player = "AI"
-                            elif button_id == "BLACK_HUMAN":
-                                black_player = "HUMAN"
-                            elif button_id == "BLACK_AI":
-                                black_player = "AI"
-                            elif button_id == "START":
-                                current_state = GameState.GAME
-                                CURRENT_TURN = 'w'  # Reset turn to white
-                                board = Board()  # Reset board
-                                selected_piece = None
-                                valid_moves = []
+                    elif current_state == GameState.PLAYER_SELECT:
+                        for button_id, button in buttons:
+                            if button.rect.collidepoint(mouse_pos):
+                                if button_id == "WHITE_HUMAN":
+                                    white_player = "HUMAN"
+                                elif button_id == "WHITE_AI":
+                                    white_player = "AI"
+                                elif button_id == "BLACK_HUMAN":
+                                    black_player = "HUMAN"
+                                elif button_id == "BLACK_AI":
+                                    black_player = "AI"
+                                elif button_id == "START":
+                                    current_state = GameState.GAME
+                                    CURRENT_TURN = 'w'  # Reset turn to white
+                                    board = Board(SELECTED_BOARD_SIZE)  # Reset board
+                                    selected_piece = None
+                                    valid_moves = frozenset()
+                                    game_result = None
+                                    move_log.clear()
+                                    update_legal_moves()
                 
-                elif current_state == GameState.GAME:
-                    # Handle menu button
-                    for button_id, button in buttons:
-                        if button_id == "MENU" and button.rect.collidepoint(mouse_pos):
-                            current_state = GameState.MENU
-                            continue
+                    elif current_state == GameState.GAME:
+                        # Handle menu button
+                        for button_id, button in buttons:
+                            if button_id == "MENU" and button.rect.collidepoint(mouse_pos):
+                                record_game('*')
+                                current_state = GameState.MENU
+                                continue
                     
-                    # Handle board clicks (only for human players)
-                    if ((CURRENT_TURN == 'w' and white_player == "HUMAN") or 
-                        (CURRENT_TURN == 'b' and black_player == "HUMAN")):
-                        if BOARD_LEFT <= mouse_pos[0] <= BOARD_LEFT + DIMENSION_X * SQ_SIZE and \
-                           BOARD_TOP <= mouse_pos[1] <= BOARD_TOP + DIMENSION_Y * SQ_SIZE:
-                            col = (mouse_pos[0] - BOARD_LEFT) // SQ_SIZE
-                            row = (mouse_pos[1] - BOARD_TOP) // SQ_SIZE
+                        # Handle board clicks (only for human players, until the game is decided)
+                        if game_result is None and (
+                            (CURRENT_TURN == 'w' and white_player == "HUMAN") or 
+                            (CURRENT_TURN == 'b' and black_player == "HUMAN")):
+                            if BOARD_LEFT <= mouse_pos[0] <= BOARD_LEFT + DIMENSION_X * SQ_SIZE and \
+                               BOARD_TOP <= mouse_pos[1] <= BOARD_TOP + DIMENSION_Y * SQ_SIZE:
+                                col = (mouse_pos[0] - BOARD_LEFT) // SQ_SIZE
+                                row = (mouse_pos[1] - BOARD_TOP) // SQ_SIZE
                             
-                            clicked_piece = board.get_piece_at((row, col))
+                                clicked_piece = board.get_piece_at((row, col))
                             
-                            if selected_piece:
-                                valid_moves = board.get_valid_moves_considering_check(selected_piece)
-                                if (row, col) in valid_moves:
-                                    # Make the move
-                                    board.move_piece(selected_piece, (row, col))
-                                    # Animate the move
-                                    start_pos = selected_piece.position
-                                    animate_human_move(WINDOW, start_pos, (row, col), selected_piece, board)
-                                    try:
-                                        move_sound = load_sound('move_pieces.wav')
-                                        move_sound.play()
-                                    except:
-                                        print("Warning: Could not load move sound")
-                                    CURRENT_TURN = 'b' if CURRENT_TURN == 'w' else 'w'
-                                    
-                                    # Check game ending conditions
-                                    if board.is_draw():
-                                        print("Game Drawn!")
-                                        show_draw_message()
-                                        transition_to_menu()
-                                    elif board.is_check(CURRENT_TURN):
-                                        try:
-                                            check_sound = load_sound('move_pieces.wav')
-                                            check_sound.play()
-                                        except:
-                                            print("Warning: Could not load check sound")
-                                        if board.is_checkmate(CURRENT_TURN):
-                                            winner = 'White' if CURRENT_TURN == 'b' else 'Black'
-                                            try:
-                                                checkmate_sound = load_sound('checkmate_sound.wav')
-                                                checkmate_sound.play()
-                                            except:
-                                                print("Warning: Could not load checkmate sound")
-                                            show_checkmate_message(winner)
-                                            transition_to_menu()
+                                # Both branches only look up this turn's legal move table
+                                if selected_piece:
+                                    if (row, col) in valid_moves:
+                                        play_move(selected_piece, (row, col))
                                 
-                                selected_piece = None
-                                valid_moves = []
-                            elif clicked_piece and clicked_piece.color == CURRENT_TURN:
-                                selected_piece = clicked_piece
-                                valid_moves = board.get_valid_moves_considering_check(clicked_piece)
-
-        pygame.display.update()
-
+                                    selected_piece = None
+                                    valid_moves = frozenset()
+                                elif clicked_piece and clicked_piece.color == CURRENT_TURN:
+                                    selected_piece = clicked_piece
+                                    valid_moves = legal_moves.get(clicked_piece.position, frozenset())
+        
+        if current_state == GameState.GAME:
+            with PROFILER.phase('ai'):
+                # Give a cooperative search its slice of this frame
+                if AI_COOPERATIVE and ai_job is not None:
+                    ai_job[0].step()
+                
+                # Play the AI's move once its search is done
+                if ai_job is not None and ai_job[0].done():
+                    future, job_board, job_turn = ai_job
+                    ai_job = None
+                    # Ignore results for a board that was reset while the AI was thinking
+                    if job_board is board and job_turn == CURRENT_TURN and game_result is None:
+                        piece, move = future.result()
+                        if piece and move:
+                            play_move(board.get_piece_at(piece.position), move)
+                
+                # Start searching as soon as it is the AI's turn
+                if ai_job is None and game_result is None and (
+                    (CURRENT_TURN == 'w' and white_player == "AI") or 
+                    (CURRENT_TURN == 'b' and black_player == "AI")):
+                    ai_job = start_ai_search()
+            
+            # Show the result once the final move has finished animating
+            if game_result is not None and not ANIMATOR.active:
+                if game_result[0] == 'draw':
+                    record_game('1/2-1/2')
+                    show_draw_message()
+                else:
+                    record_game('1-0' if game_result[1] == 'White' else '0-1')
+                    show_checkmate_message(game_result[1])
+                game_result = None
+                transition_to_menu()
+        
+        # Draw current state, only when something changed
+        dirty_rects = []
+        if current_state != drawn_state:
+            SCHEDULER.request_redraw()
+        if SCHEDULER.should_draw(ANIMATOR.active):
+            with PROFILER.phase('draw'):
+                if current_state == GameState.GAME:
+                    if drawn_state != GameState.GAME:
+                        # Entering the game screen: paint everything once
+                        WINDOW.fill(BACKGROUND)
+                        RENDERER.invalidate()
+                        ANIMATOR.clear()
+                        hud_state = None
+                        dirty_rects.append(WINDOW.get_rect())
+                    
+                    # Repaint whatever the sprites covered last frame, then draw them on top
+                    now = pygame.time.get_ticks()
+                    with PROFILER.phase('animation'):
+                        for rect in ANIMATOR.update(now):
+                            RENDERER.invalidate_rect(rect)
+                    buttons, board_rects = draw_game()
+                    dirty_rects.extend(board_rects)
+                    with PROFILER.phase('animation'):
+                        dirty_rects.extend(ANIMATOR.draw(WINDOW, now))
+                    
+                    if PROFILER.enabled:
+                        dirty_rects.append(PROFILER.draw_overlay(WINDOW, overlay_font, (10, BOARD_TOP)))
+                else:
+                    WINDOW.fill(BACKGROUND)
+                    if current_state == GameState.MENU:
+                        buttons = draw_menu()
+                    elif current_state == GameState.PLAYER_SELECT:
+                        buttons = draw_player_select()
+                    dirty_rects = [WINDOW.get_rect()]
+                drawn_state = current_state
+        
+        if SCHEDULER.exposed:
+            SCHEDULER.exposed = False
+            dirty_rects = [WINDOW.get_rect()]
+
+        with PROFILER.phase('present'):
+            if dirty_rects:
+                pygame.display.update(dirty_rects)
+        PROFILER.end_frame(ai_thinking=ai_job is not None)
+
+    if current_state == GameState.GAME:
+        record_game('*')
+    if GAME_WRITER is not None:
+        GAME_WRITER.close()
+    PROFILER.close()
+    AI_EXECUTOR.shutdown(wait=False, cancel_futures=True)
     pygame.quit()
     sys.exit()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Mini Chess")
+    parser.add_argument('--profile', action='store_true',
+                        help="show the frame-time overlay (toggle in game with F3)")
+    parser.add_argument('--profile-csv', metavar='PATH',
+                        help="write per-frame phase timings to a CSV file (implies --profile)")
+    parser.add_argument('--search-log', metavar='PATH',
+                        help="append the statistics of every AI search to a JSON-lines file")
+    parser.add_argument('--record', metavar='PATH',
+                        help="append every game played to a game record file (check with replay.py)")
+    parser.add_argument('--move-time', type=float, metavar='SECONDS',
+                        help="how long the AI may think per move (default: 1.0)")
+    parser.add_argument('--weights', metavar='PATH',
+                        help="evaluation weights written by tuner.py")
+    parser.add_argument('--cooperative', action='store_true',
+                        help="run the AI on the main thread in short slices between frames, without a thread")
+    args = parser.parse_args()
+    main(profile=args.profile, profile_csv=args.profile_csv, search_log=args.search_log, record=args.record,
+         move_time=args.move_time, weights=args.weights, cooperative=args.cooperative)
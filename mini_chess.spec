@@ -1,13 +1,23 @@
 # -*- mode: python ; coding: utf-8 -*-
+import os
+import sys
+
+sys.path.insert(0, SPECPATH)
+from build_atlas import build_atlas
 
 block_cipher = None
 
+# Pack the piece sprites, pre-scaled for each board size, into one atlas;
+# the executable ships the atlas instead of the loose images
+ATLAS_DIR = os.path.join(SPECPATH, 'build', 'atlas')
+build_atlas(os.path.join(SPECPATH, 'images'), ATLAS_DIR)
+
 a = Analysis(
     ['main.py'],
     pathex=[],
     binaries=[],
     datas=[
-        ('images/*.png', 'images'),
+        (os.path.join(ATLAS_DIR, '*'), 'images'),
         ('audios/*.wav', 'audios'),
         ('icons/*.png', 'icons')
     ],
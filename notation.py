@@ -0,0 +1,254 @@
+# Position notation for 4x4, 6x6 and 8x8 boards.
+#
+# Text: FEN-style ranks from black's side (row 0) down, separated by '/',
+# uppercase for white, lowercase for black, digits for runs of empty squares,
+# then the side to move:  "bqkb/4/4/BQKB w"
+#
+# Binary: a file is an 8-byte header (magic, version, dimension) followed by
+# fixed-width records. A record is one flags byte (bit 0 set when black is to
+# move) and the squares packed 4 bits each, two per byte, high nibble first.
+# Nibble 0 is an empty square, 1-6 white P N B R Q K, 9-14 black.
+import mmap
+from typing import Iterator, List, Tuple
+
+from rules import Board
+
+MAGIC = b'MCPO'
+VERSION = 1
+HEADER_SIZE = 8
+BLACK_TO_MOVE = 0x01
+
+PIECE_TYPES = 'PNBRQK'
+DIMENSIONS = (4, 6, 8)
+
+# Square <-> FEN letter, e.g. 'w_K' <-> 'K'
+SQUARE_TO_LETTER = {f"{color}_{t}": (t if color == 'w' else t.lower())
+                    for color in 'wb' for t in PIECE_TYPES}
+LETTER_TO_SQUARE = {letter: square for square, letter in SQUARE_TO_LETTER.items()}
+
+# Square <-> nibble
+SQUARE_TO_CODE = {'--': 0}
+SQUARE_TO_CODE.update({f"w_{t}": i + 1 for i, t in enumerate(PIECE_TYPES)})
+SQUARE_TO_CODE.update({f"b_{t}": i + 9 for i, t in enumerate(PIECE_TYPES)})
+CODE_TO_SQUARE = {code: square for square, code in SQUARE_TO_CODE.items()}
+
+# Byte -> the two squares it holds, so decoding is one lookup per byte
+BYTE_TO_SQUARES = [(CODE_TO_SQUARE.get(b >> 4), CODE_TO_SQUARE.get(b & 0x0F)) for b in range(256)]
+
+
+def grid_to_fen(grid: List[List[str]], turn: str = 'w') -> str:
+    ranks = []
+    for row in grid:
+        rank = ''
+        empty = 0
+        for square in row:
+            if square == '--':
+                empty += 1
+                continue
+            if empty:
+                rank += str(empty)
+                empty = 0
+            rank += SQUARE_TO_LETTER[square]
+        if empty:
+            rank += str(empty)
+        ranks.append(rank)
+    return '/'.join(ranks) + ' ' + turn
+
+
+def fen_to_grid(fen: str) -> Tuple[List[List[str]], str]:
+    """Parse a position into (rows of engine-style squares, side to move)"""
+    fields = fen.split()
+    if not fields or len(fields) > 2:
+        raise ValueError(f"Expected '<ranks> [w|b]', got {fen!r}")
+    turn = fields[1] if len(fields) == 2 else 'w'
+    if turn not in ('w', 'b'):
+        raise ValueError(f"Side to move must be 'w' or 'b', got {turn!r}")
+    ranks = fields[0].split('/')
+    dimension = len(ranks)
+    if dimension not in DIMENSIONS:
+        raise ValueError(f"Expected 4, 6 or 8 ranks, got {dimension}")
+    grid = []
+    for rank in ranks:
+        row = []
+        for char in rank:
+            if char.isdigit():
+                row.extend(['--'] * int(char))
+            else:
+                square = LETTER_TO_SQUARE.get(char)
+                if square is None:
+                    raise ValueError(f"Unknown piece {char!r} in {fen!r}")
+                row.append(square)
+        if len(row) != dimension:
+            raise ValueError(f"Rank {rank!r} has {len(row)} squares, expected {dimension}")
+        grid.append(row)
+    return grid, turn
+
+
+def square_name(position: Tuple[int, int], dimension: int) -> str:
+    """Board coordinates as a square name, e.g. (5, 0) -> 'a1' on 6x6"""
+    row, col = position
+    return chr(ord('a') + col) + str(dimension - row)
+
+
+def parse_square(name: str, dimension: int) -> Tuple[int, int]:
+    if len(name) != 2 or not 'a' <= name[0] < chr(ord('a') + dimension) or not '1' <= name[1] <= str(dimension):
+        raise ValueError(f"{name!r} is not a square on a {dimension}x{dimension} board")
+    return dimension - int(name[1]), ord(name[0]) - ord('a')
+
+
+def move_to_text(move: Tuple[Tuple[int, int], Tuple[int, int]], dimension: int) -> str:
+    """Coordinate notation for a (from, to) move, e.g. 'e2e3'"""
+    return square_name(move[0], dimension) + square_name(move[1], dimension)
+
+
+def text_to_move(text: str, dimension: int) -> Tuple[Tuple[int, int], Tuple[int, int]]:
+    if len(text) != 4:
+        raise ValueError(f"{text!r} is not a move like 'e2e3'")
+    return parse_square(text[:2], dimension), parse_square(text[2:], dimension)
+
+
+def board_to_fen(board: Board, turn: str = 'w') -> str:
+    return grid_to_fen(board.to_grid(), turn)
+
+
+def board_from_fen(fen: str) -> Tuple[Board, str]:
+    grid, turn = fen_to_grid(fen)
+    return Board.from_grid(grid), turn
+
+
+def gamestate_to_fen(gs) -> str:
+    """Notation for an ``engine.GameState``"""
+    return grid_to_fen(gs.board, 'w' if gs.whiteToMove else 'b')
+
+
+def gamestate_from_fen(fen: str):
+    """Build an ``engine.GameState`` holding the position"""
+    from engine import GameState
+    grid, turn = fen_to_grid(fen)
+    gs = GameState.__new__(GameState)
+    GameState.__init__(gs, len(grid))
+    gs.board = grid
+    gs.whiteToMove = turn == 'w'
+    gs.whiteKingLocation = gs.blackKingLocation = None
+    for row, squares in enumerate(grid):
+        for col, square in enumerate(squares):
+            if square == 'w_K':
+                gs.whiteKingLocation = (row, col)
+            elif square == 'b_K':
+                gs.blackKingLocation = (row, col)
+    return gs
+
+
+def record_size(dimension: int) -> int:
+    return 1 + (dimension * dimension + 1) // 2
+
+
+def encode_record(grid: List[List[str]], turn: str = 'w') -> bytes:
+    codes = [SQUARE_TO_CODE[square] for row in grid for square in row]
+    if len(codes) % 2:
+        codes.append(0)
+    packed = bytearray([BLACK_TO_MOVE if turn == 'b' else 0])
+    packed.extend((codes[i] << 4) | codes[i + 1] for i in range(0, len(codes), 2))
+    return bytes(packed)
+
+
+def decode_record(record, dimension: int) -> Tuple[List[List[str]], str]:
+    """Unpack one record (bytes or a memoryview into a file) into (grid, side to move)"""
+    squares = []
+    for byte in record[1:]:
+        squares.extend(BYTE_TO_SQUARES[byte])
+    if None in squares:
+        raise ValueError("Record holds an unknown square code")
+    grid = [squares[row * dimension:(row + 1) * dimension] for row in range(dimension)]
+    return grid, 'b' if record[0] & BLACK_TO_MOVE else 'w'
+
+
+class RecordWriter:
+    """Appends fixed-width binary position records for one board dimension"""
+
+    def __init__(self, path: str, dimension: int):
+        if dimension not in DIMENSIONS:
+            raise ValueError(f"Dimension must be 4, 6 or 8, got {dimension}")
+        self.dimension = dimension
+        self._file = open(path, 'wb')
+        self._file.write(MAGIC + bytes([VERSION, dimension, 0, 0]))
+
+    def write(self, grid: List[List[str]], turn: str = 'w'):
+        if len(grid) != self.dimension:
+            raise ValueError(f"Expected a {self.dimension}x{self.dimension} position")
+        self._file.write(encode_record(grid, turn))
+
+    def write_board(self, board: Board, turn: str = 'w'):
+        self.write(board.to_grid(), turn)
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class RecordFile:
+    """Memory-mapped reader for a binary position file.
+
+    Records are returned as memoryviews into the mapping, so iterating a file
+    copies nothing until a record is decoded. Indexing gives random access.
+    """
+
+    def __init__(self, path: str):
+        self._file = open(path, 'rb')
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise ValueError(f"{path} is empty, not a position file")
+        self._view = memoryview(self._map)
+        header = bytes(self._view[:HEADER_SIZE])
+        if len(header) < HEADER_SIZE or header[:4] != MAGIC or header[4] != VERSION or header[5] not in DIMENSIONS:
+            self.close()
+            raise ValueError(f"{path} is not a version {VERSION} position file")
+        self.dimension = header[5]
+        self.record_size = record_size(self.dimension)
+        body = len(self._view) - HEADER_SIZE
+        if body % self.record_size:
+            self.close()
+            raise ValueError(f"{path} ends with a partial record")
+        self._count = body // self.record_size
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, index: int) -> memoryview:
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError(index)
+        start = HEADER_SIZE + index * self.record_size
+        return self._view[start:start + self.record_size]
+
+    def __iter__(self) -> Iterator[memoryview]:
+        size = self.record_size
+        for start in range(HEADER_SIZE, HEADER_SIZE + self._count * size, size):
+            yield self._view[start:start + size]
+
+    def positions(self) -> Iterator[Tuple[List[List[str]], str]]:
+        """Decoded (grid, side to move) for every record"""
+        for record in self:
+            yield decode_record(record, self.dimension)
+
+    def close(self):
+        self._view.release()
+        try:
+            self._map.close()
+        except BufferError:
+            pass  # Records still referenced keep the mapping alive until they are freed
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
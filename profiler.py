@@ -0,0 +1,116 @@
+import csv
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+import pygame
+
+# Phases of a main loop frame, in CSV column order. 'wait' is time spent
+# sleeping for events or the next tick and is not counted as frame work.
+PHASES = ('wait', 'events', 'ai', 'rules', 'check', 'draw', 'animation', 'present')
+
+OVERLAY_BACKGROUND = pygame.Color(0, 0, 0)
+OVERLAY_TEXT = pygame.Color('#50C878')
+
+
+class FrameProfiler:
+    """Times each phase of every main loop frame.
+
+    Phases nest: time spent in an inner phase is not counted again in the
+    phase around it. A rolling window of frame times feeds the p50/p99
+    overlay, and with a CSV path every frame is written out as one row.
+    While disabled, ``phase`` does nothing but yield.
+    """
+
+    def __init__(self, csv_path: Optional[str] = None, window: int = 240):
+        self.csv_path = csv_path
+        self.enabled = False
+        self.frame_times: deque = deque(maxlen=window)
+        self.last_frame: Dict[str, float] = {}
+        self._times: Dict[str, float] = {}
+        self._stack: List[float] = []
+        self._frame = 0
+        self._csv_file = None
+        self._writer = None
+
+    def enable(self):
+        if self.enabled:
+            return
+        self.enabled = True
+        if self.csv_path and self._writer is None:
+            self._csv_file = open(self.csv_path, 'w', newline='')
+            self._writer = csv.writer(self._csv_file)
+            self._writer.writerow(['frame', 'time', 'frame_ms'] + [f'{p}_ms' for p in PHASES] + ['ai_thinking'])
+
+    def disable(self):
+        self.enabled = False
+        if self._csv_file is not None:
+            self._csv_file.flush()
+
+    def toggle(self):
+        if self.enabled:
+            self.disable()
+        else:
+            self.enable()
+
+    def close(self):
+        self.disable()
+        if self._csv_file is not None:
+            self._csv_file.close()
+            self._csv_file = None
+            self._writer = None
+
+    def begin_frame(self):
+        self._times = {}
+        self._stack = []
+
+    @contextmanager
+    def phase(self, name: str):
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        self._stack.append(0.0)  # Time spent in nested phases
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            nested = self._stack.pop()
+            self._times[name] = self._times.get(name, 0.0) + elapsed - nested
+            if self._stack:
+                self._stack[-1] += elapsed
+
+    def end_frame(self, ai_thinking: bool = False):
+        if not self.enabled:
+            return
+        self._frame += 1
+        frame_ms = sum(t for name, t in self._times.items() if name != 'wait') * 1000
+        self.frame_times.append(frame_ms)
+        self.last_frame = {name: t * 1000 for name, t in self._times.items()}
+        if self._writer is not None:
+            self._writer.writerow([self._frame, f'{time.time():.3f}', f'{frame_ms:.3f}'] +
+                                  [f'{self._times.get(p, 0.0) * 1000:.3f}' for p in PHASES] +
+                                  [int(ai_thinking)])
+
+    def percentile(self, p: float) -> float:
+        if not self.frame_times:
+            return 0.0
+        ordered = sorted(self.frame_times)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+    def draw_overlay(self, surface: pygame.Surface, font: pygame.font.Font,
+                     position=(10, 70)) -> pygame.Rect:
+        """Draw frame-time percentiles and the last frame's phases; returns the area drawn"""
+        lines = [f"frame p50 {self.percentile(50):5.1f} ms  p99 {self.percentile(99):5.1f} ms"]
+        for name in PHASES:
+            if name != 'wait' and self.last_frame.get(name):
+                lines.append(f"{name:>9} {self.last_frame[name]:6.2f} ms")
+        rendered = [font.render(line, True, OVERLAY_TEXT) for line in lines]
+        width = max(text.get_width() for text in rendered) + 12
+        line_height = font.get_linesize()
+        rect = pygame.Rect(position[0], position[1], width, line_height * len(PHASES) + 12)
+        surface.fill(OVERLAY_BACKGROUND, rect)
+        for i, text in enumerate(rendered):
+            surface.blit(text, (rect.x + 6, rect.y + 6 + i * line_height))
+        return rect
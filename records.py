@@ -0,0 +1,135 @@
+# Game records: a few [Tag "value"] headers followed by the moves in
+# coordinate notation, with a blank line between games:
+#
+#   [Size "6x6"]
+#   [White "HUMAN"]
+#   [Black "AI"]
+#   [Result "1-0"]
+#
+#   e2e3 b5b4 f1e2 ...
+#
+# Results are "1-0", "0-1", "1/2-1/2" or "*" for a game that was not
+# finished. A game that did not start from the usual setup has a [FEN "..."]
+# header holding its first position.
+import re
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from notation import move_to_text, text_to_move
+
+RESULTS = ('1-0', '0-1', '1/2-1/2', '*')
+SIZES = ('4x4', '6x6', '8x8')
+MOVES_PER_LINE = 16
+BUFFER_SIZE = 64 * 1024  # Bytes buffered by GameWriter before they reach the file
+
+HEADER_RE = re.compile(r'^\[(\w+) "(.*)"\]$')
+
+Move = Tuple[Tuple[int, int], Tuple[int, int]]
+
+
+class GameRecord:
+    def __init__(self, size: str, white: str = "HUMAN", black: str = "HUMAN", result: str = '*',
+                 moves: Optional[List[Move]] = None, fen: Optional[str] = None,
+                 tags: Optional[Dict[str, str]] = None):
+        if size not in SIZES:
+            raise ValueError(f"Unknown board size {size!r}")
+        if result not in RESULTS:
+            raise ValueError(f"Unknown result {result!r}")
+        self.size = size
+        self.white = white
+        self.black = black
+        self.result = result
+        self.moves = moves if moves is not None else []
+        self.fen = fen  # Starting position when it is not the usual setup
+        self.tags = tags if tags is not None else {}  # Any other headers
+
+    @property
+    def dimension(self) -> int:
+        return int(self.size[0])
+
+    def to_text(self) -> str:
+        lines = [f'[Size "{self.size}"]', f'[White "{self.white}"]', f'[Black "{self.black}"]',
+                 f'[Result "{self.result}"]']
+        if self.fen:
+            lines.append(f'[FEN "{self.fen}"]')
+        lines.extend(f'[{tag} "{value}"]' for tag, value in self.tags.items())
+        lines.append('')
+        moves = [move_to_text(move, self.dimension) for move in self.moves]
+        for i in range(0, len(moves), MOVES_PER_LINE):
+            lines.append(' '.join(moves[i:i + MOVES_PER_LINE]))
+        return '\n'.join(lines) + '\n\n'
+
+
+def split_games(lines: Iterable[str]) -> Iterator[Tuple[int, List[str]]]:
+    """Group lines into games, yielding (line number of the first header, lines)"""
+    game: List[str] = []
+    start = 0
+    in_moves = False
+    for line_number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line:
+            continue
+        if line.startswith('['):
+            if in_moves:
+                yield start, game
+                game, in_moves = [], False
+            if not game:
+                start = line_number
+        else:
+            in_moves = True
+        game.append(line)
+    if game:
+        yield start, game
+
+
+def parse_game(lines: List[str]) -> GameRecord:
+    tags = {}
+    moves_text = []
+    for line in lines:
+        if line.startswith('['):
+            match = HEADER_RE.match(line)
+            if not match:
+                raise ValueError(f"Malformed header {line!r}")
+            tags[match.group(1)] = match.group(2)
+        else:
+            moves_text.extend(line.split())
+    if 'Size' not in tags:
+        raise ValueError("Game has no [Size] header")
+    size = tags.pop('Size')
+    game = GameRecord(size, tags.pop('White', "HUMAN"), tags.pop('Black', "HUMAN"),
+                      tags.pop('Result', '*'), fen=tags.pop('FEN', None), tags=tags)
+    game.moves = [text_to_move(text, game.dimension) for text in moves_text]
+    return game
+
+
+def read_games(path: str) -> Iterator[GameRecord]:
+    with open(path) as f:
+        for _, lines in split_games(f):
+            yield parse_game(lines)
+
+
+class GameWriter:
+    """Appends games to a record file through a large write buffer.
+
+    Nothing already in the file is rewritten; games reach the disk when the
+    buffer fills, on ``flush`` and on ``close``.
+    """
+
+    def __init__(self, path: str, buffer_size: int = BUFFER_SIZE):
+        self.path = path
+        self._file = open(path, 'a', buffering=buffer_size)
+
+    def write(self, game: GameRecord):
+        self._file.write(game.to_text())
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
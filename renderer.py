@@ -0,0 +1,186 @@
+import json
+import os
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import pygame
+
+IMAGE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'images')
+ATLAS_IMAGE = 'atlas.rgba'  # Raw pre-scaled sprites written by build_atlas.py...
+ATLAS_INDEX = 'atlas.json'  # ...and where each strip and sprite is
+
+BOARD_LIGHT = pygame.Color('#F0D9B5')
+BOARD_DARK = pygame.Color('#B58863')
+HIGHLIGHT_COLOR = pygame.Color('#FF6B6B')
+CHECK_COLOR = pygame.Color('#FF6B6B')
+
+PIECE_SCALE = 0.8  # Pieces take up 80% of a square
+
+
+class BoardRenderer:
+    """Draws the board incrementally, repainting only squares whose contents changed.
+
+    The checkerboard is rendered once per (dimension, square size) into a cached
+    surface and piece sprites are decoded and scaled once per size, or cut
+    straight out of the texture atlas when build_atlas.py has made one for
+    that size. Each call to
+    ``render`` compares every square against what was drawn last time and
+    returns the rectangles that were repainted, ready for
+    ``pygame.display.update``.
+    """
+
+    def __init__(self, image_dir: str = IMAGE_DIR):
+        self.image_dir = image_dir
+        self._board_cache: Dict[Tuple[int, int], pygame.Surface] = {}
+        self._image_cache: Dict[Tuple[str, str, int], pygame.Surface] = {}
+        self._atlas_index: Optional[dict] = None  # atlas.json, read on first use ({} without an atlas)
+        self._atlas_strips: Dict[str, Dict[str, pygame.Surface]] = {}  # Strip -> piece name -> sprite
+        self._check_overlay: Optional[pygame.Surface] = None
+        self._drawn: Dict[Tuple[int, int], tuple] = {}  # (row, col) -> state last drawn there
+        self._geometry: Optional[Tuple[int, int, int, int]] = None
+
+    def invalidate(self):
+        """Forget what is on screen so the next render repaints every square"""
+        self._drawn.clear()
+
+    def invalidate_rect(self, rect: pygame.Rect):
+        """Mark the squares overlapping a screen rectangle for repainting"""
+        if self._geometry is None:
+            return
+        dimension, sq_size, left, top = self._geometry
+        first_col = max(0, (rect.left - left) // sq_size)
+        last_col = min(dimension - 1, (rect.right - 1 - left) // sq_size)
+        first_row = max(0, (rect.top - top) // sq_size)
+        last_row = min(dimension - 1, (rect.bottom - 1 - top) // sq_size)
+        for row in range(first_row, last_row + 1):
+            for col in range(first_col, last_col + 1):
+                self._drawn.pop((row, col), None)
+
+    def board_surface(self, dimension: int, sq_size: int) -> pygame.Surface:
+        key = (dimension, sq_size)
+        surface = self._board_cache.get(key)
+        if surface is None:
+            surface = pygame.Surface((dimension * sq_size, dimension * sq_size))
+            colors = [BOARD_LIGHT, BOARD_DARK]
+            for row in range(dimension):
+                for col in range(dimension):
+                    rect = (col * sq_size, row * sq_size, sq_size, sq_size)
+                    surface.fill(colors[(row + col) % 2], rect)
+            self._board_cache[key] = surface
+        return surface
+
+    def atlas_sprites(self, strip: str) -> Optional[Dict[str, pygame.Surface]]:
+        """Sprites of one strip of the texture atlas (a square size, or 'source'); None if it has none
+
+        Each strip is stored as raw pixels in one stretch of the atlas file,
+        so loading it is a single seek and read, with nothing to decode.
+        """
+        if self._atlas_index is None:
+            index_path = os.path.join(self.image_dir, ATLAS_INDEX)
+            self._atlas_index = {}
+            if os.path.exists(index_path):
+                with open(index_path) as f:
+                    self._atlas_index = json.load(f)
+        sprites = self._atlas_strips.get(strip)
+        if sprites is None:
+            entry = self._atlas_index.get('strips', {}).get(strip)
+            if entry is None:
+                return None
+            width, height = entry['size']
+            with open(os.path.join(self.image_dir, self._atlas_index['image']), 'rb') as f:
+                f.seek(entry['offset'])
+                surface = pygame.image.frombytes(f.read(width * height * 4), (width, height), 'RGBA')
+            sprites = {name: surface.subsurface(rect) for name, rect in entry['sprites'].items()}
+            self._atlas_strips[strip] = sprites
+        return sprites
+
+    def piece_image(self, color: str, type: str, sq_size: int) -> pygame.Surface:
+        key = (color, type, sq_size)
+        image = self._image_cache.get(key)
+        if image is None:
+            name = f"{color}_{type}"
+            sprites = self.atlas_sprites(str(sq_size))
+            if sprites is not None and name in sprites:
+                image = sprites[name]  # Scaled at build time
+                if pygame.display.get_surface() is not None:
+                    image = image.convert_alpha()  # Only the sprites actually drawn are converted
+            else:
+                sources = self.atlas_sprites('source')
+                if sources is not None and name in sources:
+                    original = sources[name]
+                else:
+                    piece_path = os.path.join(self.image_dir, f"{name}.png")
+                    if not os.path.exists(piece_path):
+                        print(f"Error: Piece image not found: {piece_path}")
+                        raise FileNotFoundError(f"Piece image not found: {piece_path}")
+                    original = pygame.image.load(piece_path)
+                size = int(sq_size * PIECE_SCALE)
+                image = pygame.transform.scale(original, (size, size))
+                if pygame.display.get_surface() is not None:
+                    image = image.convert_alpha()
+            self._image_cache[key] = image
+        return image
+
+    def square_rect(self, row: int, col: int) -> pygame.Rect:
+        _, sq_size, left, top = self._geometry
+        return pygame.Rect(left + col * sq_size, top + row * sq_size, sq_size, sq_size)
+
+    def render(self, surface: pygame.Surface, pieces: Iterable, dimension: int,
+               left: int, top: int, sq_size: int,
+               highlights: Iterable[Tuple[int, int]] = (),
+               checked: Iterable[Tuple[int, int]] = (),
+               hidden: Iterable[Tuple[int, int]] = ()) -> List[pygame.Rect]:
+        """Repaint the squares that changed since the last call and return their rectangles
+
+        Pieces on ``hidden`` squares are left out, e.g. while a sprite is still
+        sliding towards them.
+        """
+        geometry = (dimension, sq_size, left, top)
+        if geometry != self._geometry:
+            self._geometry = geometry
+            self._drawn.clear()
+
+        occupancy = {piece.position: (piece.color, piece.type) for piece in pieces}
+        # Callers usually pass sets already; only copy other iterables
+        if not isinstance(highlights, (set, frozenset)):
+            highlights = set(highlights)
+        if not isinstance(checked, (set, frozenset)):
+            checked = set(checked)
+        for pos in hidden:
+            occupancy.pop(pos, None)
+
+        dirty = []
+        for row in range(dimension):
+            for col in range(dimension):
+                pos = (row, col)
+                state = (occupancy.get(pos), pos in highlights, pos in checked)
+                if self._drawn.get(pos) != state:
+                    dirty.append(self._draw_square(surface, row, col, state))
+                    self._drawn[pos] = state
+        return dirty
+
+    def _draw_square(self, surface: pygame.Surface, row: int, col: int, state: tuple) -> pygame.Rect:
+        dimension, sq_size, _, _ = self._geometry
+        piece, highlighted, checked = state
+        rect = self.square_rect(row, col)
+
+        # Restore the plain square from the cached board
+        area = pygame.Rect(col * sq_size, row * sq_size, sq_size, sq_size)
+        surface.blit(self.board_surface(dimension, sq_size), rect, area)
+
+        # Highlight valid moves
+        if highlighted:
+            s = 5  # Border thickness
+            pygame.draw.rect(surface, HIGHLIGHT_COLOR, rect.inflate(-2 * s, -2 * s), 3)
+
+        # Highlight king in check
+        if checked:
+            if self._check_overlay is None or self._check_overlay.get_width() != sq_size:
+                self._check_overlay = pygame.Surface((sq_size, sq_size))
+                self._check_overlay.set_alpha(128)  # Semi-transparent
+                self._check_overlay.fill(CHECK_COLOR)
+            surface.blit(self._check_overlay, rect)
+
+        if piece:
+            image = self.piece_image(piece[0], piece[1], sq_size)
+            surface.blit(image, image.get_rect(center=rect.center))
+        return rect
@@ -0,0 +1,130 @@
+"""Replay recorded games and check every move against the rules.
+
+    python replay.py games.txt [more.txt ...] [--workers N] [--chunk-size N]
+
+Each game is set up from its [Size] (or [FEN]) header and replayed move by
+move; a move is accepted only if the piece on its from-square belongs to the
+side to move and the rules allow it. Finished games must also end the way
+their [Result] says. Games are checked in parallel worker processes; every
+invalid game is printed with the ply that failed, followed by a summary.
+The exit status is 1 if any game is invalid.
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from notation import board_from_fen, move_to_text
+from records import GameRecord, parse_game, split_games
+from rules import Board
+
+CHUNK_SIZE = 64  # Games sent to a worker at a time
+CHUNKS_PER_WORKER = 2  # Chunks queued per worker before reading more input
+
+
+def validate_game(game: GameRecord) -> Tuple[int, Optional[str]]:
+    """Replay a game; returns (plies replayed, error or None)"""
+    if game.fen:
+        board, turn = board_from_fen(game.fen)
+        if board.size != game.size:
+            return 0, f"FEN is for {board.size}, game is {game.size}"
+    else:
+        board, turn = Board(game.size), 'w'
+
+    for ply, (start, end) in enumerate(game.moves):
+        text = move_to_text((start, end), board.dimension)
+        if len(board.pieces) == 2:
+            return ply, f"ply {ply + 1} {text}: the game was already drawn"
+        piece = board.get_piece_at(start)
+        if piece is None or piece.color != turn:
+            return ply, f"ply {ply + 1} {text}: no {'white' if turn == 'w' else 'black'} piece to move"
+        # Only this move's destination needs the (costly) own-king check
+        if end not in piece.get_valid_moves(board):
+            return ply, f"ply {ply + 1} {text}: illegal move"
+        board.move_piece(piece, end)
+        if board.is_check(turn):
+            return ply, f"ply {ply + 1} {text}: leaves the king in check"
+        turn = 'b' if turn == 'w' else 'w'
+
+    plies = len(game.moves)
+    if game.result in ('1-0', '0-1'):
+        loser = 'b' if game.result == '1-0' else 'w'
+        if turn != loser or not board.is_check(turn) or not board.is_checkmate(turn):
+            return plies, f"result {game.result} but the final position is not checkmate"
+    elif game.result == '1/2-1/2' and not board.is_draw(turn):
+        return plies, "result 1/2-1/2 but the final position is not a draw"
+    return plies, None
+
+
+def _validate_chunk(chunk: List[Tuple[int, int, List[str]]]) -> List[Tuple[int, int, int, Optional[str]]]:
+    """Runs in a worker process: (game number, line, plies, error) for each game"""
+    results = []
+    for number, line, lines in chunk:
+        try:
+            plies, error = validate_game(parse_game(lines))
+        except Exception as e:
+            plies, error = 0, f"{type(e).__name__}: {e}"
+        results.append((number, line, plies, error))
+    return results
+
+
+def _chunks(paths: Iterable[str], size: int) -> Iterator[List[Tuple[int, int, List[str]]]]:
+    chunk = []
+    number = 0
+    for path in paths:
+        with open(path) as f:
+            for line, lines in split_games(f):
+                number += 1
+                chunk.append((number, line, lines))
+                if len(chunk) == size:
+                    yield chunk
+                    chunk = []
+    if chunk:
+        yield chunk
+
+
+def validate_files(paths: Iterable[str], workers: Optional[int] = None,
+                   chunk_size: int = CHUNK_SIZE) -> Iterator[Tuple[int, int, int, Optional[str]]]:
+    """Check every game in the files in worker processes, yielding results as they finish"""
+    workers = workers or os.cpu_count() or 1
+    max_pending = workers * CHUNKS_PER_WORKER
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = set()
+        for chunk in _chunks(paths, chunk_size):
+            pending.add(pool.submit(_validate_chunk, chunk))
+            if len(pending) >= max_pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield from future.result()
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield from future.result()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('files', nargs='+', help="game record files")
+    parser.add_argument('--workers', type=int, help="worker processes (default: one per core)")
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help="games per worker task")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    games = plies = invalid = 0
+    for number, line, game_plies, error in validate_files(args.files, args.workers, args.chunk_size):
+        games += 1
+        plies += game_plies
+        if error:
+            invalid += 1
+            print(f"game {number} (line {line}): {error}")
+    elapsed = time.perf_counter() - start
+    rate = games / elapsed if elapsed > 0 else 0.0
+    print(f"{games} games, {plies} plies, {invalid} invalid in {elapsed:.2f} s ({rate:.0f} games/s)")
+    if invalid:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
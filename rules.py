@@ -0,0 +1,448 @@
+# Mini chess rules: pieces, move generation and check detection.
+# Keep this module free of pygame so the rules and the AI can be imported
+# headlessly, e.g. by worker processes and command line tools.
+import random
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+# Zobrist keys: one random 64-bit number per (color, type, square). A position
+# hashes to the XOR of its pieces' keys, so a move updates the hash in O(1).
+_zobrist_random = random.Random(0x5EED)
+ZOBRIST = {(color, type, (row, col)): _zobrist_random.getrandbits(64)
+           for color in 'wb' for type in 'PNBRQK' for row in range(8) for col in range(8)}
+
+# Piece geometry, shared with the evaluation's attack maps
+KNIGHT_OFFSETS = [(-2, -1), (-2, 1), (-1, -2), (-1, 2), (1, -2), (1, 2), (2, -1), (2, 1)]
+KING_OFFSETS = [(-1, 0), (1, 0), (0, -1), (0, 1), (-1, -1), (-1, 1), (1, -1), (1, 1)]
+BISHOP_DIRECTIONS = [(-1, -1), (-1, 1), (1, -1), (1, 1)]
+ROOK_DIRECTIONS = [(-1, 0), (1, 0), (0, -1), (0, 1)]
+QUEEN_DIRECTIONS = [(-1, 0), (1, 0), (0, -1), (0, 1), (-1, -1), (-1, 1), (1, -1), (1, 1)]
+SLIDING_DIRECTIONS = {'B': BISHOP_DIRECTIONS, 'Q': QUEEN_DIRECTIONS}
+
+
+class MoveTables:
+    """Where every piece can go from every square of one board size, worked out once
+
+    Move generation walks these lists instead of adding offsets and checking
+    each result against the board edges. All lists follow the order of the
+    offset and direction lists above.
+    """
+
+    def __init__(self, dimension: int):
+        self.dimension = dimension
+        squares = [(row, col) for row in range(dimension) for col in range(dimension)]
+
+        def on_board(row, col):
+            return 0 <= row < dimension and 0 <= col < dimension
+
+        def steps(offsets):
+            return {(r, c): tuple((r + dr, c + dc) for dr, dc in offsets if on_board(r + dr, c + dc))
+                    for r, c in squares}
+
+        def ray(r, c, dr, dc):
+            line = []
+            r, c = r + dr, c + dc
+            while on_board(r, c):
+                line.append((r, c))
+                r, c = r + dr, c + dc
+            return tuple(line)
+
+        self.knight = steps(KNIGHT_OFFSETS)
+        self.king = steps(KING_OFFSETS)
+        # Square -> direction -> the squares along it, nearest first
+        self.rays = {(r, c): {d: ray(r, c, *d) for d in QUEEN_DIRECTIONS} for r, c in squares}
+        # Piece type -> square -> its non-empty rays
+        self.slider_rays = {type: {sq: tuple(self.rays[sq][d] for d in directions if self.rays[sq][d])
+                                   for sq in squares}
+                            for type, directions in SLIDING_DIRECTIONS.items()}
+        # Color -> square -> the square a pawn advances to (None on the last rank),
+        # and the squares it captures on
+        self.pawn_push = {color: {(r, c): (r + dr, c) if on_board(r + dr, c) else None for r, c in squares}
+                          for color, dr in (('w', -1), ('b', 1))}
+        self.pawn_captures = {color: steps([(dr, -1), (dr, 1)]) for color, dr in (('w', -1), ('b', 1))}
+
+
+MOVE_TABLES = {dimension: MoveTables(dimension) for dimension in (4, 6, 8)}
+
+
+class Piece:
+    def __init__(self, color: str, type: str, position: Tuple[int, int]):
+        self.color = color  # 'w' or 'b'
+        self.type = type    # 'P', 'N', 'B', 'Q', 'K'
+        self.position = position
+        self.index = -1  # Slot in board.pieces, kept up to date by the Board
+
+    def get_valid_moves(self, board: 'Board') -> List[Tuple[int, int]]:
+        tables = MOVE_TABLES[board.dimension]
+        squares = board.squares
+        color = self.color
+        moves = []
+
+        if self.type == 'P':
+            # Move forward
+            target = tables.pawn_push[color][self.position]
+            if target is not None and target not in squares:
+                moves.append(target)
+            # Capture diagonally
+            for target in tables.pawn_captures[color][self.position]:
+                piece = squares.get(target)
+                if piece is not None and piece.color != color:
+                    moves.append(target)
+        elif self.type == 'N' or self.type == 'K':
+            for target in (tables.knight if self.type == 'N' else tables.king)[self.position]:
+                piece = squares.get(target)
+                if piece is None or piece.color != color:
+                    moves.append(target)
+        elif self.type in tables.slider_rays:
+            # Bishops and queens slide until they reach a piece
+            for ray in tables.slider_rays[self.type][self.position]:
+                for target in ray:
+                    piece = squares.get(target)
+                    if piece is None:
+                        moves.append(target)
+                    else:
+                        if piece.color != color:
+                            moves.append(target)
+                        break
+        return moves
+
+    def generate_moves(self, board: 'Board', captures: bool) -> Iterator[Tuple[int, int]]:
+        """Yield only the captures, or only the quiet moves, of get_valid_moves"""
+        tables = MOVE_TABLES[board.dimension]
+        squares = board.squares
+        color = self.color
+
+        if self.type == 'P':
+            if captures:
+                for target in tables.pawn_captures[color][self.position]:
+                    piece = squares.get(target)
+                    if piece is not None and piece.color != color:
+                        yield target
+            else:
+                target = tables.pawn_push[color][self.position]
+                if target is not None and target not in squares:
+                    yield target
+        elif self.type == 'N' or self.type == 'K':
+            for target in (tables.knight if self.type == 'N' else tables.king)[self.position]:
+                piece = squares.get(target)
+                if piece is None:
+                    if not captures:
+                        yield target
+                elif captures and piece.color != color:
+                    yield target
+        elif self.type in tables.slider_rays:
+            for ray in tables.slider_rays[self.type][self.position]:
+                for target in ray:
+                    piece = squares.get(target)
+                    if piece is None:
+                        if not captures:
+                            yield target
+                    else:
+                        if captures and piece.color != color:
+                            yield target
+                        break
+
+class Board:
+    def __init__(self, size: str = "6x6"):
+        self.size = size
+        self.dimension = int(size[0])
+        self.pieces: List[Piece] = []
+        self.squares: Dict[Tuple[int, int], Piece] = {}
+        self.hash = 0  # Zobrist hash of the pieces, see ZOBRIST
+        self.pawn_hash = 0  # Zobrist hash of the pawns alone, for pawn-structure caches
+        self.history: List[tuple] = []  # Undo records for unmake_move
+        self.setup_board()
+
+    def setup_board(self):
+        self.pieces.clear()
+        # Adjust setup based on board size
+        if self.size == "4x4":
+            # New 4x4 setup with Bishops instead of Pawns
+            self.pieces.append(Piece('b', 'B', (0, 0)))
+            self.pieces.append(Piece('b', 'Q', (0, 1)))
+            self.pieces.append(Piece('b', 'K', (0, 2)))
+            self.pieces.append(Piece('b', 'B', (0, 3)))
+            self.pieces.append(Piece('w', 'B', (3, 0)))
+            self.pieces.append(Piece('w', 'Q', (3, 1)))
+            self.pieces.append(Piece('w', 'K', (3, 2)))
+            self.pieces.append(Piece('w', 'B', (3, 3)))
+        elif self.size == "6x6":
+            # Setup as per logs
+            self.pieces.append(Piece('b', 'N', (0, 0)))
+            self.pieces.append(Piece('b', 'B', (0, 1)))
+            self.pieces.append(Piece('b', 'Q', (0, 2)))
+            self.pieces.append(Piece('b', 'K', (0, 3)))
+            self.pieces.append(Piece('b', 'B', (0, 4)))
+            self.pieces.append(Piece('b', 'N', (0, 5)))
+            for i in range(6):
+                self.pieces.append(Piece('b', 'P', (1, i)))
+            for i in range(6):
+                self.pieces.append(Piece('w', 'P', (4, i)))
+            self.pieces.append(Piece('w', 'N', (5, 0)))
+            self.pieces.append(Piece('w', 'B', (5, 1)))
+            self.pieces.append(Piece('w', 'Q', (5, 2)))
+            self.pieces.append(Piece('w', 'K', (5, 3)))
+            self.pieces.append(Piece('w', 'B', (5, 4)))
+            self.pieces.append(Piece('w', 'N', (5, 5)))
+        elif self.size == "8x8":
+            # Standard chess setup
+            self.pieces.append(Piece('b', 'R', (0, 0)))
+            self.pieces.append(Piece('b', 'N', (0, 1)))
+            self.pieces.append(Piece('b', 'B', (0, 2)))
+            self.pieces.append(Piece('b', 'Q', (0, 3)))
+            self.pieces.append(Piece('b', 'K', (0, 4)))
+            self.pieces.append(Piece('b', 'B', (0, 5)))
+            self.pieces.append(Piece('b', 'N', (0, 6)))
+            self.pieces.append(Piece('b', 'R', (0, 7)))
+            for i in range(8):
+                self.pieces.append(Piece('b', 'P', (1, i)))
+            for i in range(8):
+                self.pieces.append(Piece('w', 'P', (6, i)))
+            self.pieces.append(Piece('w', 'R', (7, 0)))
+            self.pieces.append(Piece('w', 'N', (7, 1)))
+            self.pieces.append(Piece('w', 'B', (7, 2)))
+            self.pieces.append(Piece('w', 'Q', (7, 3)))
+            self.pieces.append(Piece('w', 'K', (7, 4)))
+            self.pieces.append(Piece('w', 'B', (7, 5)))
+            self.pieces.append(Piece('w', 'N', (7, 6)))
+            self.pieces.append(Piece('w', 'R', (7, 7)))
+        self.reindex()
+
+    def reindex(self):
+        """Rebuild the square map, piece slots and hash from the piece list"""
+        self.squares = {}
+        self.hash = 0
+        self.pawn_hash = 0
+        self.history = []
+        for i, piece in enumerate(self.pieces):
+            piece.index = i
+            self.squares[piece.position] = piece
+            self.hash ^= ZOBRIST[piece.color, piece.type, piece.position]
+            if piece.type == 'P':
+                self.pawn_hash ^= ZOBRIST[piece.color, piece.type, piece.position]
+
+    def get_piece_at(self, position: Tuple[int, int]) -> Optional[Piece]:
+        return self.squares.get(position)
+
+    def copy(self) -> 'Board':
+        """Independent copy of the position, e.g. for the AI to search on another thread"""
+        clone = Board.__new__(Board)
+        clone.size = self.size
+        clone.dimension = self.dimension
+        clone.pieces = [Piece(p.color, p.type, p.position) for p in self.pieces]
+        clone.reindex()
+        return clone
+
+    @classmethod
+    def from_grid(cls, grid: List[List[str]]) -> 'Board':
+        """Build a position from rows of engine-style squares ('w_K', 'b_P', '--')"""
+        dimension = len(grid)
+        if dimension not in (4, 6, 8) or any(len(row) != dimension for row in grid):
+            raise ValueError(f"Board must be 4x4, 6x6 or 8x8, got {dimension} rows")
+        board = Board.__new__(cls)
+        board.size = f"{dimension}x{dimension}"
+        board.dimension = dimension
+        board.pieces = []
+        for row, squares in enumerate(grid):
+            for col, square in enumerate(squares):
+                if square == '--':
+                    continue
+                if len(square) != 3 or square[0] not in 'wb' or square[2] not in 'PNBRQK':
+                    raise ValueError(f"Unknown square {square!r} at {(row, col)}")
+                board.pieces.append(Piece(square[0], square[2], (row, col)))
+        board.reindex()
+        return board
+
+    def to_grid(self) -> List[List[str]]:
+        """Rows of engine-style squares, the inverse of ``from_grid``"""
+        grid = [['--'] * self.dimension for _ in range(self.dimension)]
+        for piece in self.pieces:
+            row, col = piece.position
+            grid[row][col] = f"{piece.color}_{piece.type}"
+        return grid
+
+    def move_piece(self, piece: Piece, new_pos: Tuple[int, int]):
+        self.make_move(piece, new_pos)
+
+    def make_move(self, piece: Piece, new_pos: Tuple[int, int]) -> Optional[Piece]:
+        """Move a piece, capturing whatever stands on new_pos, in O(1)
+
+        A captured piece is swapped out with the last piece in the list, and
+        the move is pushed on the history so ``unmake_move`` can restore the
+        list, square map and hash exactly. Returns the captured piece.
+        """
+        origin = piece.position
+        captured = self.squares.get(new_pos)
+        if captured is not None:
+            last = self.pieces.pop()
+            if last is not captured:
+                self.pieces[captured.index] = last
+                last.index = captured.index
+            self.hash ^= ZOBRIST[captured.color, captured.type, new_pos]
+            if captured.type == 'P':
+                self.pawn_hash ^= ZOBRIST[captured.color, captured.type, new_pos]
+        del self.squares[origin]
+        self.squares[new_pos] = piece
+        piece.position = new_pos
+        change = ZOBRIST[piece.color, piece.type, origin] ^ ZOBRIST[piece.color, piece.type, new_pos]
+        self.hash ^= change
+        if piece.type == 'P':
+            self.pawn_hash ^= change
+        self.history.append((piece, origin, captured))
+        return captured
+
+    def unmake_move(self):
+        """Take back the last make_move"""
+        piece, origin, captured = self.history.pop()
+        new_pos = piece.position
+        change = ZOBRIST[piece.color, piece.type, origin] ^ ZOBRIST[piece.color, piece.type, new_pos]
+        self.hash ^= change
+        if piece.type == 'P':
+            self.pawn_hash ^= change
+        piece.position = origin
+        self.squares[origin] = piece
+        if captured is not None:
+            # Put the captured piece back in its slot and the swapped piece back at the end
+            index = captured.index
+            if index < len(self.pieces):
+                moved = self.pieces[index]
+                moved.index = len(self.pieces)
+                self.pieces.append(moved)
+                self.pieces[index] = captured
+            else:
+                self.pieces.append(captured)
+            self.squares[new_pos] = captured
+            self.hash ^= ZOBRIST[captured.color, captured.type, new_pos]
+            if captured.type == 'P':
+                self.pawn_hash ^= ZOBRIST[captured.color, captured.type, new_pos]
+        else:
+            del self.squares[new_pos]
+
+    def is_check(self, color: str) -> bool:
+        king_pos = None
+        for piece in self.pieces:
+            if piece.color == color and piece.type == 'K':
+                king_pos = piece.position
+                break
+        if not king_pos:
+            return False
+        return self.is_square_attacked(king_pos, 'b' if color == 'w' else 'w')
+
+    def is_square_attacked(self, square: Tuple[int, int], by_color: str) -> bool:
+        """Whether a piece of by_color could move to square, looking outward from the square
+
+        The move tables are symmetric, so an attacker can only stand on a
+        square the same piece could reach from here; this avoids generating
+        any of the attacker's moves.
+        """
+        tables = MOVE_TABLES[self.dimension]
+        squares = self.squares
+        # Pawns attacking the square stand where a pawn of the other color would capture
+        for target in tables.pawn_captures['b' if by_color == 'w' else 'w'][square]:
+            piece = squares.get(target)
+            if piece is not None and piece.color == by_color and piece.type == 'P':
+                return True
+        for steps, type in ((tables.knight, 'N'), (tables.king, 'K')):
+            for target in steps[square]:
+                piece = squares.get(target)
+                if piece is not None and piece.color == by_color and piece.type == type:
+                    return True
+        rays = tables.rays[square]
+        for directions, sliders in ((BISHOP_DIRECTIONS, 'BQ'), (ROOK_DIRECTIONS, 'Q')):
+            for direction in directions:
+                for target in rays[direction]:
+                    piece = squares.get(target)
+                    if piece is not None:
+                        if piece.color == by_color and piece.type in sliders:
+                            return True
+                        break
+        return False
+
+    def is_checkmate(self, color: str) -> bool:
+        return self.is_check(color) and not self.has_any_legal_move(color)
+
+    def has_any_legal_move(self, color: str) -> bool:
+        """Whether color has a legal move, stopping at the first one found
+
+        King moves are tried first, as they are the likeliest way out of a
+        check, then captures, then the remaining quiet moves.
+        """
+        king = None
+        for piece in self.pieces:
+            if piece.color == color and piece.type == 'K':
+                king = piece
+                break
+        if king is not None:
+            for captures in (True, False):
+                for target in king.generate_moves(self, captures):
+                    if self.is_legal(king, target):
+                        return True
+        for piece, target in self.generate_captures(color):
+            if piece is not king and self.is_legal(piece, target):
+                return True
+        for piece, target in self.generate_quiet_moves(color):
+            if piece is not king and self.is_legal(piece, target):
+                return True
+        return False
+
+    def is_legal(self, piece: Piece, new_pos: Tuple[int, int]) -> bool:
+        """Whether a move from get_valid_moves leaves the mover's king out of check"""
+        self.make_move(piece, new_pos)
+        in_check = self.is_check(piece.color)
+        self.unmake_move()
+        return not in_check
+
+    def generate_captures(self, color: str) -> Iterator[Tuple[Piece, Tuple[int, int]]]:
+        """Yield color's captures as (piece, target), without testing them for check
+
+        Generators like this one let a search produce moves in stages and
+        skip the later stages when an early move already causes a cutoff.
+        The board may be changed between items as long as every change is
+        taken back before the next one is asked for.
+        """
+        for piece in self.pieces:
+            if piece.color == color:
+                for target in piece.generate_moves(self, True):
+                    yield piece, target
+
+    def generate_quiet_moves(self, color: str) -> Iterator[Tuple[Piece, Tuple[int, int]]]:
+        """Yield color's non-capturing moves as (piece, target), without testing them for check"""
+        for piece in self.pieces:
+            if piece.color == color:
+                for target in piece.generate_moves(self, False):
+                    yield piece, target
+
+    def get_valid_moves_considering_check(self, piece: Piece) -> List[Tuple[int, int]]:
+        """Get valid moves that don't leave the king in check"""
+        moves = piece.get_valid_moves(self)
+        valid_moves = []
+        
+        # Test each move
+        for move in moves:
+            # If move doesn't leave king in check, it's valid
+            self.make_move(piece, move)
+            if not self.is_check(piece.color):
+                valid_moves.append(move)
+            self.unmake_move()
+                
+        return valid_moves
+
+    def legal_move_map(self, color: str) -> Dict[Tuple[int, int], Set[Tuple[int, int]]]:
+        """All of color's legal moves at once: square of each piece that can move -> its targets"""
+        moves = {}
+        for piece in self.pieces:
+            if piece.color == color:
+                targets = self.get_valid_moves_considering_check(piece)
+                if targets:
+                    moves[piece.position] = set(targets)
+        return moves
+
+    def is_draw(self, current_color: str) -> bool:
+        """Check if the game is a draw (only kings left or stalemate for the side to move)"""
+        # Check if only kings remain
+        if len(self.pieces) == 2:
+            kings = [p for p in self.pieces if p.type == 'K']
+            if len(kings) == 2:
+                return True
+                
+        # Check for stalemate (no legal moves but not in check)
+        return not self.is_check(current_color) and not self.has_any_legal_move(current_color)
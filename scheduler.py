@@ -0,0 +1,64 @@
+from typing import List
+
+import pygame
+
+# Events that never change what is on screen
+PASSIVE_EVENTS = (pygame.MOUSEMOTION, pygame.ACTIVEEVENT, pygame.WINDOWENTER,
+                  pygame.WINDOWLEAVE, pygame.WINDOWMOVED, pygame.AUDIODEVICEADDED)
+
+# Events after which the window contents must be pushed again
+EXPOSE_EVENTS = (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED, pygame.WINDOWSHOWN,
+                 pygame.WINDOWRESTORED, pygame.WINDOWSIZECHANGED)
+
+
+class IdleScheduler:
+    """Runs the main loop at full frame rate only while something is moving.
+
+    While idle, ``next_events`` sleeps inside SDL until an event arrives, so a
+    window waiting for a click costs no CPU. Worker threads wake the loop by
+    posting an event. ``should_draw`` tells the loop whether anything changed
+    since the last frame that was drawn.
+    """
+
+    def __init__(self, fps: int):
+        self.fps = fps
+        self.clock = pygame.time.Clock()
+        self._redraw = True
+        self.exposed = False  # Window needs a full push, e.g. after being uncovered
+
+    def request_redraw(self):
+        self._redraw = True
+
+    def next_events(self, active: bool) -> List[pygame.event.Event]:
+        """Wait for the next frame when animating, otherwise block until an event arrives"""
+        if active:
+            self.clock.tick(self.fps)
+            events = pygame.event.get()
+        else:
+            events = [pygame.event.wait()]
+            events.extend(pygame.event.get())
+            self.clock.tick()  # Restart frame timing after the sleep
+        for event in events:
+            if event.type in EXPOSE_EVENTS:
+                self.exposed = True
+            if event.type not in PASSIVE_EVENTS:
+                self._redraw = True
+        return events
+
+    def should_draw(self, active: bool) -> bool:
+        """True once per change, and on every frame while an animation runs"""
+        redraw = self._redraw or active
+        self._redraw = False
+        return redraw
+
+
+def wait_for_click():
+    """Sleep until the window is clicked, for modal overlays"""
+    while True:
+        event = pygame.event.wait()
+        if event.type == pygame.QUIT:
+            return False
+        if event.type == pygame.MOUSEBUTTONDOWN:
+            return True
+        if event.type in EXPOSE_EVENTS:
+            pygame.display.update()
@@ -0,0 +1,109 @@
+"""Play the AI against itself and append the games to a game record file.
+
+    python selfplay.py games.txt [--games N] [--size 6x6 ...] [--depth N] [--nodes N]
+                                 [--random-plies N] [--max-plies N] [--workers N] [--seed N]
+
+Each game starts with a few random moves so the games differ, then both
+sides play the AI's move at the given depth (or node budget). A game ends
+in checkmate or a draw, or is recorded unfinished ("*") after --max-plies.
+Games are played in parallel worker processes and can be checked with
+replay.py or used to tune the evaluation with tuner.py.
+"""
+import argparse
+import os
+import random
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Iterator, List, Optional, Tuple
+
+from ai import Searcher, search
+from records import SIZES, GameRecord, GameWriter
+from rules import Board
+
+GAMES_PER_CHUNK = 4  # Games played by a worker per task
+CHUNKS_PER_WORKER = 2  # Tasks queued per worker
+RANDOM_PLIES = 4
+MAX_PLIES = 120
+
+
+def play_game(size: str, depth: int, nodes: Optional[int], random_plies: int, max_plies: int) -> GameRecord:
+    board = Board(size)
+    turn = 'w'
+    game = GameRecord(size, "AI", "AI")
+    while len(game.moves) < max_plies:
+        if len(game.moves) < random_plies:
+            moves = Searcher(board, size).legalMoves(turn)
+            piece, move = random.choice(moves) if moves else (None, None)
+        else:
+            result = search(board, turn, size, depth=depth, maxNodes=nodes)
+            piece, move = result.piece, result.move
+        if move is None:
+            break
+        game.moves.append((piece.position, move))
+        board.move_piece(piece, move)
+        mover, turn = turn, 'b' if turn == 'w' else 'w'
+        if board.is_checkmate(turn):
+            game.result = '1-0' if mover == 'w' else '0-1'
+            break
+        if board.is_draw(turn):
+            game.result = '1/2-1/2'
+            break
+    return game
+
+
+def _play_chunk(chunk: List[Tuple[int, str]], depth: int, nodes: Optional[int], random_plies: int,
+                max_plies: int) -> List[GameRecord]:
+    """Runs in a worker process: play (seed, size) games"""
+    games = []
+    for seed, size in chunk:
+        random.seed(seed)
+        games.append(play_game(size, depth, nodes, random_plies, max_plies))
+    return games
+
+
+def _chunks(games: int, sizes: List[str], seed: int) -> Iterator[List[Tuple[int, str]]]:
+    chooser = random.Random(seed)
+    specs = [(seed + i, chooser.choice(sizes)) for i in range(games)]
+    for i in range(0, games, GAMES_PER_CHUNK):
+        yield specs[i:i + GAMES_PER_CHUNK]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('output', help="game record file to append to")
+    parser.add_argument('--games', type=int, default=100, help="games to play")
+    parser.add_argument('--size', action='append', choices=SIZES, help="board size (repeat for several)")
+    parser.add_argument('--depth', type=int, default=2, help="search depth per move")
+    parser.add_argument('--nodes', type=int, help="node budget per move")
+    parser.add_argument('--random-plies', type=int, default=RANDOM_PLIES, help="random moves at the start")
+    parser.add_argument('--max-plies', type=int, default=MAX_PLIES, help="plies before a game is left unfinished")
+    parser.add_argument('--workers', type=int, help="worker processes (default: one per core)")
+    parser.add_argument('--seed', type=int, default=0, help="seed for the random moves and board sizes")
+    args = parser.parse_args()
+
+    workers = args.workers or os.cpu_count() or 1
+    start = time.perf_counter()
+    results = {}
+    with GameWriter(args.output) as writer, ProcessPoolExecutor(max_workers=workers) as pool:
+        def collect(done):
+            for future in done:
+                for game in future.result():
+                    writer.write(game)
+                    results[game.result] = results.get(game.result, 0) + 1
+
+        pending = set()
+        for chunk in _chunks(args.games, args.size or list(SIZES), args.seed):
+            pending.add(pool.submit(_play_chunk, chunk, args.depth, args.nodes, args.random_plies, args.max_plies))
+            if len(pending) >= workers * CHUNKS_PER_WORKER:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                collect(done)
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            collect(done)
+    elapsed = time.perf_counter() - start
+    summary = ', '.join(f"{count} {result}" for result, count in sorted(results.items()))
+    print(f"{args.games} games ({summary}) in {elapsed:.1f} s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,411 @@
+"""Host many concurrent games over TCP, with AI moves searched in a worker pool.
+
+    python server.py [--host 127.0.0.1] [--port 8765] [--workers N] [--max-queue N] [--move-time S]
+                     [--weights weights.json]
+    python server.py --simulate 200 [--plies 40] [--workers N]
+
+Clients send one JSON object per line and get one JSON object back per
+request; a request's "id", if any, is copied to its reply so a connection
+can have several requests in flight:
+
+    {"id": 1, "op": "new", "size": "6x6", "white": "human", "black": "ai", "move_time": 0.2}
+    {"id": 2, "op": "move", "game": 17, "move": "c2c3"}
+    {"id": 3, "op": "state", "game": 17}
+    {"id": 4, "op": "close", "game": 17}
+    {"id": 5, "op": "metrics"}
+
+Replies to "new", "move" and "state" describe the game: its position in
+notation.py's text, the side to move, the legal moves when it is a human's
+turn, the AI's reply ("reply") and the result once the game is over. A
+game's AI thinks for its own "move_time" (capped by --move-time), and time
+spent waiting for a worker counts against it. Problems come back as
+{"ok": false, "error": ...}; "server busy" means the AI queue is full and
+the request may be sent again later. Games belong to the connection that
+created them and end with it.
+
+--simulate starts the server on a free local port, plays that many
+simulated clients against it (random legal moves against the AI) and
+prints the metrics.
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import random
+import sys
+import time
+import traceback
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Set
+
+from ai import MAX_DEPTH, TimeManager, loadWeights, search
+from notation import board_from_fen, board_to_fen, move_to_text, text_to_move
+from records import SIZES
+from rules import Board
+
+PORT = 8765
+MOVE_TIME = 0.2  # Seconds the AI thinks per move unless a game asks for less
+MIN_MOVE_TIME = 0.01  # Least time a search is given, however long it waited
+QUEUE_PER_WORKER = 64  # AI moves allowed to wait per worker before requests are turned away
+LATENCY_WINDOW = 10000  # Recent AI moves the latency percentiles are taken over
+PLAYERS = ('human', 'ai')
+
+
+def search_move(fen: str, move_time: float, queued_at: float) -> Optional[str]:
+    """Runs in a worker process: the AI's move in coordinate notation, or None without one"""
+    board, turn = board_from_fen(fen)
+    budget = max(move_time - (time.time() - queued_at), MIN_MOVE_TIME)
+    result = search(board, turn, board.size, depth=MAX_DEPTH, timeManager=TimeManager(moveTime=budget))
+    if result.move is None:
+        return None
+    return move_to_text((result.piece.position, result.move), board.dimension)
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+class ServerBusy(Exception):
+    """The AI queue is full"""
+
+
+class Game:
+    def __init__(self, game_id: int, size: str, white: str, black: str, move_time: float):
+        self.id = game_id
+        self.board = Board(size)
+        self.turn = 'w'
+        self.players = {'w': white, 'b': black}
+        self.move_time = move_time
+        self.moves: List[str] = []
+        self.result: Optional[str] = None
+        self.thinking = False  # An AI move is queued or being searched
+
+    @property
+    def opponent(self) -> str:
+        return 'b' if self.turn == 'w' else 'w'
+
+    def legal_moves(self) -> List[str]:
+        moves = []
+        for piece in self.board.pieces:
+            if piece.color == self.turn:
+                for end in self.board.get_valid_moves_considering_check(piece):
+                    target = self.board.get_piece_at(end)
+                    if not target or target.type != 'K':
+                        moves.append(move_to_text((piece.position, end), self.board.dimension))
+        return moves
+
+    def play(self, text: str):
+        """Play a move for the side to move, raising ValueError if it is illegal"""
+        start, end = text_to_move(text, self.board.dimension)
+        piece = self.board.get_piece_at(start)
+        target = self.board.get_piece_at(end)
+        if piece is None or piece.color != self.turn or (target and target.type == 'K') or \
+                end not in self.board.get_valid_moves_considering_check(piece):
+            raise ValueError(f"illegal move {text}")
+        self.board.move_piece(piece, end)
+        self.moves.append(text)
+        mover, self.turn = self.turn, self.opponent
+        if self.board.is_checkmate(self.turn):
+            self.result = '1-0' if mover == 'w' else '0-1'
+        elif self.board.is_draw(self.turn):
+            self.result = '1/2-1/2'
+
+    def describe(self) -> Dict:
+        state = {'ok': True, 'game': self.id, 'fen': board_to_fen(self.board, self.turn), 'turn': self.turn,
+                 'plies': len(self.moves), 'result': self.result}
+        if self.result is None and self.players[self.turn] == 'human':
+            state['moves'] = self.legal_moves()
+        return state
+
+
+class Metrics:
+    def __init__(self):
+        self.connections = 0
+        self.games_started = 0
+        self.games_finished = 0
+        self.human_moves = 0
+        self.ai_moves = 0
+        self.rejected = 0  # AI moves turned away because the queue was full
+        self.queued = 0  # AI moves waiting for a worker
+        self.running = 0  # AI moves being searched
+        self.max_queued = 0
+        self.latencies = deque(maxlen=LATENCY_WINDOW)  # Seconds from request to AI move
+        self.waits = deque(maxlen=LATENCY_WINDOW)  # Seconds spent waiting for a worker
+
+    def as_dict(self, active_games: int) -> Dict:
+        latencies, waits = list(self.latencies), list(self.waits)
+        return {
+            'connections': self.connections,
+            'active_games': active_games,
+            'games_started': self.games_started,
+            'games_finished': self.games_finished,
+            'human_moves': self.human_moves,
+            'ai_moves': self.ai_moves,
+            'rejected': self.rejected,
+            'queue_depth': self.queued,
+            'max_queue_depth': self.max_queued,
+            'running': self.running,
+            'latency_p50': round(percentile(latencies, 0.5), 4),
+            'latency_p99': round(percentile(latencies, 0.99), 4),
+            'latency_max': round(max(latencies, default=0.0), 4),
+            'wait_p99': round(percentile(waits, 0.99), 4),
+        }
+
+
+class GameServer:
+    """Games, the connections that own them and the pool that searches AI moves"""
+
+    def __init__(self, workers: Optional[int] = None, max_queue: Optional[int] = None,
+                 move_time: float = MOVE_TIME, weights: Optional[str] = None):
+        self.workers = workers or os.cpu_count() or 1
+        self.max_queue = max_queue if max_queue is not None else self.workers * QUEUE_PER_WORKER
+        self.move_time = move_time
+        self.games: Dict[int, Game] = {}
+        self.metrics = Metrics()
+        self._next_id = 1
+        # Spawned rather than forked workers, so they don't inherit (and hold open) client sockets
+        self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context('spawn'),
+                                         initializer=loadWeights if weights else None,
+                                         initargs=(weights,) if weights else ())
+        self._slots = asyncio.Semaphore(self.workers)  # One search per worker at a time
+
+    def close(self):
+        self._pool.shutdown(cancel_futures=True)
+
+    async def handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        owned: Set[int] = set()
+        tasks = set()
+        self.metrics.connections += 1
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if line.strip():
+                    task = asyncio.create_task(self._reply(line, owned, writer))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+        except ConnectionError:
+            pass
+        finally:
+            for task in tasks:
+                task.cancel()
+            for game_id in owned:
+                self.games.pop(game_id, None)
+            self.metrics.connections -= 1
+            writer.close()
+
+    async def _reply(self, line: bytes, owned: Set[int], writer: asyncio.StreamWriter):
+        request = {}
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("a request must be a JSON object")
+            reply = await self.dispatch(request, owned)
+        except ServerBusy:
+            reply = {'ok': False, 'error': "server busy"}
+        except (ValueError, KeyError, TypeError) as e:
+            reply = {'ok': False, 'error': f"{type(e).__name__}: {e}"}
+        except Exception as e:  # A broken worker pool or a server bug: still answer, and log it
+            print(f"request {line.strip()[:200]!r} failed:", file=sys.stderr)
+            traceback.print_exc()
+            reply = {'ok': False, 'error': f"internal error: {type(e).__name__}: {e}"}
+        if isinstance(request, dict) and 'id' in request:
+            reply['id'] = request['id']
+        try:
+            writer.write((json.dumps(reply) + '\n').encode())
+            await writer.drain()
+        except ConnectionError:
+            pass  # The client went away before its reply
+
+    async def dispatch(self, request: Dict, owned: Set[int]) -> Dict:
+        op = request.get('op')
+        if op == 'metrics':
+            return dict(self.metrics.as_dict(len(self.games)), ok=True)
+        if op == 'new':
+            return await self.new_game(request, owned)
+        if op not in ('move', 'state', 'close'):
+            raise ValueError(f"unknown op {op!r}")
+        game_id = request['game']
+        if game_id not in owned or game_id not in self.games:
+            raise ValueError(f"no game {game_id}")
+        game = self.games[game_id]
+        if op == 'state':
+            return game.describe()
+        if op == 'close':
+            del self.games[game_id]
+            owned.discard(game_id)
+            return {'ok': True, 'game': game_id}
+        return await self.play_move(game, request['move'])
+
+    async def new_game(self, request: Dict, owned: Set[int]) -> Dict:
+        size = request.get('size', "6x6")
+        white, black = request.get('white', 'human'), request.get('black', 'ai')
+        if size not in SIZES:
+            raise ValueError(f"unknown board size {size!r}")
+        if white not in PLAYERS or black not in PLAYERS:
+            raise ValueError(f"players must be one of {PLAYERS}")
+        if white == black == 'ai':
+            raise ValueError("at least one player must be human")
+        move_time = min(float(request.get('move_time', self.move_time)), self.move_time)
+        if white == 'ai':
+            self.check_capacity()
+        game = Game(self._next_id, size, white, black, move_time)
+        self._next_id += 1
+        self.games[game.id] = game
+        owned.add(game.id)
+        self.metrics.games_started += 1
+        reply = await self.play_ai(game)
+        return dict(game.describe(), **reply)
+
+    async def play_move(self, game: Game, text: str) -> Dict:
+        if game.result is not None:
+            raise ValueError(f"game {game.id} is over ({game.result})")
+        if game.thinking or game.players[game.turn] != 'human':
+            raise ValueError("it is not a human's turn")
+        if game.players[game.opponent] == 'ai':
+            self.check_capacity()  # Before the move, so a busy reply leaves the game as it was
+        game.play(text)
+        self.metrics.human_moves += 1
+        if game.result is not None:
+            self.metrics.games_finished += 1
+        reply = await self.play_ai(game)
+        return dict(game.describe(), **reply)
+
+    async def play_ai(self, game: Game) -> Dict:
+        """Play the AI's move if it is the AI's turn"""
+        if game.result is not None or game.players[game.turn] != 'ai':
+            return {}
+        text = await self.search(game)
+        if text is None:
+            return {}
+        game.play(text)
+        if game.result is not None:
+            self.metrics.games_finished += 1
+        return {'reply': text}
+
+    def check_capacity(self):
+        """Turn the request away if the AI queue is full"""
+        if self.metrics.queued >= self.max_queue:
+            self.metrics.rejected += 1
+            raise ServerBusy()
+
+    async def search(self, game: Game) -> Optional[str]:
+        """Queue a search of the game's position, waiting for a free worker"""
+        metrics = self.metrics
+        fen = board_to_fen(game.board, game.turn)
+        start = time.perf_counter()
+        queued_at = time.time()
+        game.thinking = True
+        metrics.queued += 1
+        metrics.max_queued = max(metrics.max_queued, metrics.queued)
+        waiting = True
+        try:
+            async with self._slots:
+                metrics.queued -= 1
+                waiting = False
+                metrics.waits.append(time.perf_counter() - start)
+                metrics.running += 1
+                try:
+                    loop = asyncio.get_running_loop()
+                    text = await loop.run_in_executor(self._pool, search_move, fen, game.move_time, queued_at)
+                finally:
+                    metrics.running -= 1
+        finally:
+            if waiting:
+                metrics.queued -= 1
+            game.thinking = False
+        metrics.ai_moves += 1
+        metrics.latencies.append(time.perf_counter() - start)
+        return text
+
+
+async def serve(host: str, port: int, server: GameServer):
+    listener = await asyncio.start_server(server.handle_client, host, port)
+    print(f"serving on {host}:{port} with {server.workers} workers", file=sys.stderr)
+    async with listener:
+        await listener.serve_forever()
+
+
+async def simulated_client(host: str, port: int, size: str, plies: int, move_time: float) -> int:
+    """Play random legal moves against the AI; returns the plies played"""
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        return await _play_random_game(reader, writer, size, plies, move_time)
+    finally:
+        writer.close()
+        await writer.wait_closed()
+
+
+async def _play_random_game(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, size: str, plies: int,
+                            move_time: float) -> int:
+    async def send(request: Dict) -> Dict:
+        while True:
+            writer.write((json.dumps(request) + '\n').encode())
+            await writer.drain()
+            reply = json.loads(await reader.readline())
+            if reply.get('error') != "server busy":
+                return reply
+            await asyncio.sleep(random.uniform(0.05, 0.2))  # Back off while the server is busy
+
+    white, black = random.choice([('human', 'ai'), ('ai', 'human')])
+    state = await send({'op': 'new', 'size': size, 'white': white, 'black': black, 'move_time': move_time})
+    while state['result'] is None and state['plies'] < plies and state.get('moves'):
+        state = await send({'op': 'move', 'game': state['game'], 'move': random.choice(state['moves'])})
+        if not state['ok']:
+            raise RuntimeError(state['error'])
+    await send({'op': 'close', 'game': state['game']})
+    return state['plies']
+
+
+async def simulate(server: GameServer, clients: int, plies: int, move_time: float):
+    listener = await asyncio.start_server(server.handle_client, '127.0.0.1', 0)
+    host, port = listener.sockets[0].getsockname()[:2]
+    start = time.perf_counter()
+    async with listener:
+        results = await asyncio.gather(
+            *(simulated_client(host, port, random.choice(SIZES), plies, move_time) for _ in range(clients)),
+            return_exceptions=True)
+        while server.metrics.connections:
+            await asyncio.sleep(0.01)  # Let the server see every client hang up
+    elapsed = time.perf_counter() - start
+    errors = [r for r in results if isinstance(r, Exception)]
+    for error in errors[:5]:
+        print(f"client failed: {type(error).__name__}: {error}", file=sys.stderr)
+    summary = dict(server.metrics.as_dict(len(server.games)), clients=clients, failed_clients=len(errors),
+                   elapsed=round(elapsed, 3), plies=sum(r for r in results if isinstance(r, int)))
+    print(json.dumps(summary))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=PORT)
+    parser.add_argument('--workers', type=int, help="AI worker processes (default: one per core)")
+    parser.add_argument('--max-queue', type=int,
+                        help=f"AI moves that may wait for a worker (default: {QUEUE_PER_WORKER} per worker)")
+    parser.add_argument('--move-time', type=float, default=MOVE_TIME, help="longest AI thinking time per move")
+    parser.add_argument('--simulate', type=int, metavar='CLIENTS', help="play simulated clients and print metrics")
+    parser.add_argument('--plies', type=int, default=40, help="plies per simulated game")
+    parser.add_argument('--weights', metavar='PATH', help="evaluation weights written by tuner.py")
+    args = parser.parse_args()
+
+    server = GameServer(args.workers, args.max_queue, args.move_time, args.weights)
+    try:
+        if args.simulate:
+            asyncio.run(simulate(server, args.simulate, args.plies, args.move_time))
+        else:
+            asyncio.run(serve(args.host, args.port, server))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+import os
+import threading
+from typing import Dict, Optional
+
+import pygame
+from pygame import mixer
+
+AUDIO_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'audios')
+
+# Effect name -> file in the audios directory
+SOUND_FILES: Dict[str, str] = {
+    'move': 'move_pieces.wav',
+    'check': 'move_pieces.wav',
+    'undo': 'undo_moves.wav',
+    'checkmate': 'checkmate_sound.wav',
+    'transition': 'Chess Sound Effects.wav',
+}
+
+_PENDING = object()  # Marker for effects the background loader has not reached yet
+
+
+class SoundBank:
+    """Decodes every sound effect once and plays it on a reserved mixer channel.
+
+    Files that are missing or fail to decode are cached as missing, so playing
+    them later is a silent no-op instead of another disk lookup. With
+    ``background=True`` decoding happens on a daemon thread and ``play`` never
+    waits for it: an effect that is not decoded yet is simply skipped.
+    """
+
+    def __init__(self, files: Dict[str, str] = SOUND_FILES, audio_dir: str = AUDIO_DIR,
+                 background: bool = False):
+        self.files = dict(files)
+        self.audio_dir = audio_dir
+        self._sounds: Dict[str, object] = {name: _PENDING for name in self.files}
+        self._channels: Dict[str, mixer.Channel] = {}
+        self._loader: Optional[threading.Thread] = None
+
+        if not mixer.get_init():
+            # No audio device: every effect is missing
+            self._sounds = {name: None for name in self.files}
+            return
+
+        # One reserved channel per effect so effects never steal each other's channel
+        mixer.set_num_channels(max(mixer.get_num_channels(), len(self.files)))
+        mixer.set_reserved(len(self.files))
+        for i, name in enumerate(self.files):
+            self._channels[name] = mixer.Channel(i)
+
+        if background:
+            self._loader = threading.Thread(target=self._load_all, name='sound-loader', daemon=True)
+            self._loader.start()
+        else:
+            self._load_all()
+
+    def _load_all(self):
+        decoded: Dict[str, Optional[mixer.Sound]] = {}  # filename -> Sound, shared between effects
+        for name, filename in self.files.items():
+            if filename not in decoded:
+                decoded[filename] = self._decode(filename)
+            self._sounds[name] = decoded[filename]
+
+    def _decode(self, filename: str) -> Optional[mixer.Sound]:
+        path = os.path.join(self.audio_dir, filename)
+        if not os.path.exists(path):
+            print(f"Warning: Sound file not found: {path}")
+            return None
+        try:
+            return mixer.Sound(path)
+        except pygame.error as e:
+            print(f"Warning: Could not load sound {path}: {e}")
+            return None
+
+    def wait_until_loaded(self, timeout: Optional[float] = None):
+        if self._loader is not None:
+            self._loader.join(timeout)
+
+    def is_available(self, name: str) -> bool:
+        sound = self._sounds.get(name)
+        return sound is not None and sound is not _PENDING
+
+    def play(self, name: str):
+        """Play an effect without blocking; unknown, missing or still-loading effects are skipped"""
+        sound = self._sounds.get(name)
+        if sound is None or sound is _PENDING:
+            return
+        self._channels[name].play(sound)
@@ -5,6 +5,8 @@ from pygame.locals import *
 
 import ai
 import engine
+from animation import Animator, MoveAnimation
+from sounds import SoundBank
 
 pygame.init()
 
@@ -62,18 +64,21 @@ BLACK_MAN = False
 WHITE_AI = False
 WHITE_MAN = False
 
+# piece slides, advanced once per frame by the main loop
+ANIMATOR = Animator()
+
 ########################## PROCESS FUNCTIONS ##########################
 
+SOUND_EFFECTS = None
+
+
 def loadSoundEffects():
 
-    effects = {}
-    move_piece = pygame.mixer.Sound('./audios/move_pieces.wav')
-    undo_move = pygame.mixer.Sound('./audios/undo_moves.wav')
-    checkmate = pygame.mixer.Sound('./audios/checkmate_sound.wav')
-    effects['move'] = move_piece
-    effects['undo'] = undo_move
-    effects['checkmate'] = checkmate
-    return effects
+    # decode the effects once and reuse them for every move and undo
+    global SOUND_EFFECTS
+    if SOUND_EFFECTS is None:
+        SOUND_EFFECTS = SoundBank(background=True)
+    return SOUND_EFFECTS
 
 
 def loadImages():
@@ -147,7 +152,7 @@ def drawGameState(WINDOW, GAME_STATE, validMoves, sqSelected, lastMove, restart)
     drawBoard(WINDOW)
     highlightSquare(WINDOW, GAME_STATE, validMoves,
                     sqSelected, lastMove, restart)
-    drawPieces(WINDOW, GAME_STATE.board)
+    drawPieces(WINDOW, GAME_STATE.board, ANIMATOR.hidden_squares())
     drawButtons(WINDOW, GAME_STATE)
 
 
@@ -190,14 +195,15 @@ def drawBoard(WINDOW):
                             (DIMENSION_Y-1) * SQ_SIZE + 45))
 
 
-def drawPieces(WINDOW, Board):
+def drawPieces(WINDOW, Board, hidden=()):
 
     IMAGES = loadImages()
 
     for row in range(DIMENSION_X):
         for col in range(DIMENSION_Y):
             piece = Board[col][row]
-            if piece != '--':
+            # pieces still sliding towards their square are drawn by the animator
+            if piece != '--' and (col, row) not in hidden:
                 WINDOW.blit(IMAGES[piece], pygame.Rect(
                     row*SQ_SIZE, col*SQ_SIZE, SQ_SIZE, SQ_SIZE))
 
@@ -246,36 +252,22 @@ def drawButtons(WINDOW, GAME_STATE):
     makeButton(WINDOW, TOGGLE_BUTTON_3_POS, BUTTON_WIDTH+50, BUTTON_HEIGHT, TEXT='HUMAN', BTN_COLOR=white_man, BTN_RADIUS=15)
 
 
-def animateMove(move, WINDOW, board, clock):
+def animateMove(move):
+    # queue the slide, the main loop draws it frame by frame
     dR = move.endRow - move.startRow
     dC = move.endCol - move.startCol
     framePerSquare = 10
     frameCount = (abs(dR) + abs(dC)) * framePerSquare
     IMAGES = loadImages()
 
-    for frame in range(frameCount + 1):
-        row, col = (move.startRow + dR*frame/frameCount,
-                    move.startCol + dC*frame/frameCount)
-
-        # redraw the board
-        drawBoard(WINDOW)
-        drawPieces(WINDOW, board)
+    # the captured piece stays on the square until the moving piece arrives
+    captured = IMAGES[move.pieceCaptured] if move.pieceCaptured != '--' else None
 
-        # erase piece from ending square
-        endSquare = pygame.Rect(move.endCol*SQ_SIZE,
-                                move.endRow*SQ_SIZE, SQ_SIZE, SQ_SIZE)
-        pygame.draw.rect(WINDOW, (BOARD_COLOR_A if (
-            (move.endRow+move.endCol) % 2 == 0) else BOARD_COLOR_B), endSquare)
-
-        # draw captured piece onto the square
-        if move.pieceCaptured != '--':
-            WINDOW.blit(IMAGES[move.pieceCaptured], endSquare)
-
-        # draw moving piece
-        WINDOW.blit(IMAGES[move.pieceMoved], pygame.Rect(
-            col*SQ_SIZE, row*SQ_SIZE, SQ_SIZE, SQ_SIZE))
-        pygame.display.update()
-        clock.tick(60)
+    ANIMATOR.start(MoveAnimation(IMAGES[move.pieceMoved],
+                                 (move.startCol*SQ_SIZE, move.startRow*SQ_SIZE),
+                                 (move.endCol*SQ_SIZE, move.endRow*SQ_SIZE),
+                                 pygame.time.get_ticks(), duration=frameCount*1000//60,
+                                 square=(move.endRow, move.endCol), captured=captured))
 
 
 def drawCheckText(screen, text):
@@ -418,7 +410,7 @@ def main():
 
                                         # playing move piece sound
                                         sound_effects = loadSoundEffects()
-                                        sound_effects['move'].play()
+                                        sound_effects.play('move')
 
                                         pieceClickCount = 0
                                         selectedSq = []
@@ -515,7 +507,7 @@ def main():
                         moveMade = True
                         animate = False
                         sound_effects = loadSoundEffects()
-                        sound_effects['undo'].play()
+                        sound_effects.play('undo')
                         lastMove = [(move.startRow, move.startCol),
                                     (move.endRow, move.endCol)]
                     else:
@@ -538,7 +530,7 @@ def main():
 
                 # playing piece moving sound
                 sound_effects = loadSoundEffects()
-                sound_effects['move'].play()
+                sound_effects.play('move')
 
                 # track last move
                 lastMove = [(aiMove.startRow, aiMove.startCol),
@@ -547,8 +539,7 @@ def main():
         # update valid moves
         if moveMade:
             if animate:
-                animateMove(GAME_STATE.moveLog[-1],
-                            WINDOW, GAME_STATE.board, clock)
+                animateMove(GAME_STATE.moveLog[-1])
             validMoves = GAME_STATE.getValidMoves()
             moveMade = False
             animate = False
@@ -557,6 +548,11 @@ def main():
         drawGameState(WINDOW, GAME_STATE, validMoves,
                       selectedSq, lastMove, restart)
 
+        # draw pieces that are still sliding
+        now = pygame.time.get_ticks()
+        ANIMATOR.update(now)
+        ANIMATOR.draw(WINDOW, now)
+
         # check message handling section
         if GAME_STATE.inCheck():
             drawCheckText(WINDOW, 'Check')
@@ -570,7 +566,7 @@ def main():
                 drawGameOverText(WINDOW, 'White wins by Checkmate', 'Green')
 
             # sound_effect = loadSoundEffects()
-            # sound_effect['checkmate'].play()
+            # sound_effect.play('checkmate')
 
         if GAME_STATE.staleMate:
             gameOver = True
@@ -0,0 +1,231 @@
+"""Fit the evaluation weights to game results (Texel tuning) and write them as JSON.
+
+    python tuner.py games.txt [more.txt ...] -o weights.json [--save-features features.npz]
+    python tuner.py --features features.npz -o weights.json [--iterations N]
+
+Every quiet position of every finished game in the record files (from
+selfplay.py, or main.py --record) becomes one row of ai.FEATURES, labelled
+with the game's result from the side to move's point of view: 1 for a win,
+0.5 for a draw, 0 for a loss. A position is quiet when the side to move is
+not in check, has no mate in one, and neither the move before nor the move
+played from it is a capture. Features are extracted in parallel worker
+processes into NumPy arrays, which --save-features keeps for later runs.
+
+For each board size the fit first finds the scale K at which
+sigmoid(K * evaluation) best predicts the results with the current
+weights, then moves all weights together by gradient descent (Adam) on the
+mean squared error over every position at once. Positions with identical
+features are first merged into one row, weighted by their number and
+labelled with their mean result; this leaves the gradient unchanged and
+turns millions of positions into a few thousand rows. The weights file
+maps board sizes to {feature: weight} and is read by ai.loadWeights, or
+main.py --weights.
+
+Needs NumPy (pip install numpy), which the game itself does not.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    sys.exit("tuner.py needs NumPy: pip install numpy")
+
+from ai import FEATURES, WEIGHTS, evaluationFeatures, loadWeights
+from notation import board_from_fen
+from records import SIZES, parse_game, split_games
+from rules import Board
+
+CHUNK_SIZE = 64  # Games sent to a worker at a time
+CHUNKS_PER_WORKER = 2  # Chunks queued per worker before reading more input
+ITERATIONS = 2000
+LEARNING_RATE = 0.5  # Largest step Adam takes per iteration, in evaluation points
+MIN_POSITIONS = 1000  # Sizes with fewer quiet positions keep their weights
+
+RESULT_SCORES = {'1-0': 1.0, '0-1': 0.0, '1/2-1/2': 0.5}
+Features = Dict[str, Tuple[np.ndarray, np.ndarray]]  # Size -> (features, results)
+
+
+def game_features(lines: List[str]) -> Tuple[str, List[List[int]], List[float]]:
+    """Features and results of a finished game's quiet positions"""
+    game = parse_game(lines)
+    rows, results = [], []
+    if game.result not in RESULT_SCORES:
+        return game.size, rows, results
+    white_score = RESULT_SCORES[game.result]
+    if game.fen:
+        board, turn = board_from_fen(game.fen)
+    else:
+        board, turn = Board(game.size), 'w'
+    captured = False
+    for start, end in game.moves:
+        capture = end in board.squares
+        if not captured and not capture and not board.is_check(turn):
+            features = evaluationFeatures(board, turn, game.size)
+            if features is not None:
+                rows.append(features)
+                results.append(white_score if turn == 'w' else 1.0 - white_score)
+        board.move_piece(board.get_piece_at(start), end)
+        captured = capture
+        turn = 'b' if turn == 'w' else 'w'
+    return game.size, rows, results
+
+
+def _extract_chunk(chunk: List[List[str]]) -> Features:
+    """Runs in a worker process: features of a chunk of games, by board size"""
+    rows = {size: ([], []) for size in SIZES}
+    for lines in chunk:
+        size, features, results = game_features(lines)
+        rows[size][0].extend(features)
+        rows[size][1].extend(results)
+    return {size: (np.array(features, dtype=np.float32).reshape(-1, len(FEATURES)),
+                   np.array(results, dtype=np.float32))
+            for size, (features, results) in rows.items() if results}
+
+
+def _chunks(paths: Iterable[str], size: int) -> Iterator[List[List[str]]]:
+    chunk = []
+    for path in paths:
+        with open(path) as f:
+            for _, lines in split_games(f):
+                chunk.append(lines)
+                if len(chunk) == size:
+                    yield chunk
+                    chunk = []
+    if chunk:
+        yield chunk
+
+
+def extract_features(paths: Iterable[str], workers: Optional[int] = None, chunk_size: int = CHUNK_SIZE) -> Features:
+    """Features of every quiet position in the record files, extracted in worker processes"""
+    workers = workers or os.cpu_count() or 1
+    parts = {size: [] for size in SIZES}
+
+    def collect(done):
+        for future in done:
+            for size, arrays in future.result().items():
+                parts[size].append(arrays)
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = set()
+        for chunk in _chunks(paths, chunk_size):
+            pending.add(pool.submit(_extract_chunk, chunk))
+            if len(pending) >= workers * CHUNKS_PER_WORKER:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                collect(done)
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            collect(done)
+    return {size: (np.concatenate([x for x, _ in arrays]), np.concatenate([y for _, y in arrays]))
+            for size, arrays in parts.items() if arrays}
+
+
+def save_features(path: str, features: Features):
+    np.savez(path, **{f"{kind}_{size}": array for size, arrays in features.items()
+                      for kind, array in zip('xy', arrays)})
+
+
+def load_features(path: str) -> Features:
+    with np.load(path) as data:
+        return {size: (data[f"x_{size}"], data[f"y_{size}"]) for size in SIZES if f"x_{size}" in data}
+
+
+def compress(x: np.ndarray, y: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Merge positions with identical features: (features, mean result, positions merged)"""
+    x = np.ascontiguousarray(x, dtype=np.float64)
+    rows = x.view(np.dtype((np.void, x.dtype.itemsize * x.shape[1]))).ravel()
+    _, first, inverse, counts = np.unique(rows, return_index=True, return_inverse=True, return_counts=True)
+    totals = np.bincount(inverse.ravel(), weights=y, minlength=len(first))
+    return x[first], totals / counts, counts.astype(np.float64)
+
+
+def sigmoid(x: np.ndarray) -> np.ndarray:
+    return 1.0 / (1.0 + np.exp(-np.clip(x, -50.0, 50.0)))
+
+
+def loss(x: np.ndarray, y: np.ndarray, counts: np.ndarray, weights: np.ndarray, scale: float) -> float:
+    """Mean squared error over the merged rows, weighted by the positions in each"""
+    return float(np.sum(counts * (sigmoid(scale * (x @ weights)) - y) ** 2) / np.sum(counts))
+
+
+def fit_scale(x: np.ndarray, y: np.ndarray, counts: np.ndarray, weights: np.ndarray) -> float:
+    """The K for which sigmoid(K * evaluation) best predicts the results"""
+    scales = np.geomspace(1e-4, 1.0, 400)
+    errors = [loss(x, y, counts, weights, k) for k in scales]
+    return float(scales[int(np.argmin(errors))])
+
+
+def tune(x: np.ndarray, y: np.ndarray, counts: np.ndarray, initial: List[float], iterations: int = ITERATIONS,
+         rate: float = LEARNING_RATE) -> Tuple[np.ndarray, float]:
+    """Texel-tune the weights for one board size on compressed rows; returns (weights, K)"""
+    weights = np.array(initial, dtype=np.float64)
+    scale = fit_scale(x, y, counts, weights)
+    share = counts / np.sum(counts)
+    m = np.zeros_like(weights)
+    v = np.zeros_like(weights)
+    beta1, beta2, eps = 0.9, 0.999, 1e-8
+    for t in range(1, iterations + 1):
+        predicted = sigmoid(scale * (x @ weights))
+        # d/dw of the weighted mean of (p - y)^2 with p = sigmoid(K * x.w)
+        gradient = (2.0 * scale * share * (predicted - y) * predicted * (1.0 - predicted)) @ x
+        m = beta1 * m + (1 - beta1) * gradient
+        v = beta2 * v + (1 - beta2) * gradient ** 2
+        weights -= rate * (m / (1 - beta1 ** t)) / (np.sqrt(v / (1 - beta2 ** t)) + eps)
+    return weights, scale
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('games', nargs='*', help="game record files")
+    parser.add_argument('--features', help="read features saved by --save-features instead of games")
+    parser.add_argument('--save-features', metavar='PATH', help="save the extracted features (.npz)")
+    parser.add_argument('-o', '--output', required=True, help="weights file to write")
+    parser.add_argument('--start', metavar='PATH', help="weights file to start from (default: ai's weights)")
+    parser.add_argument('--iterations', type=int, default=ITERATIONS, help="gradient steps per board size")
+    parser.add_argument('--rate', type=float, default=LEARNING_RATE, help="learning rate")
+    parser.add_argument('--workers', type=int, help="worker processes (default: one per core)")
+    args = parser.parse_args()
+    if not args.games and not args.features:
+        parser.error("give game record files or --features")
+
+    start = time.perf_counter()
+    if args.features:
+        features = load_features(args.features)
+    else:
+        features = extract_features(args.games, args.workers)
+        if args.save_features:
+            save_features(args.save_features, features)
+    print(f"features of {sum(len(y) for _, y in features.values())} positions "
+          f"in {time.perf_counter() - start:.1f} s", file=sys.stderr)
+    if args.start:
+        loadWeights(args.start)
+
+    tuned = {}
+    for size, (x, y) in sorted(features.items()):
+        if len(y) < MIN_POSITIONS:
+            print(f"{size}: only {len(y)} positions, not tuned", file=sys.stderr)
+            continue
+        start = time.perf_counter()
+        rows, results, counts = compress(x, y)
+        weights, scale = tune(rows, results, counts, WEIGHTS[size], args.iterations, args.rate)
+        # The merged rows' error leaves out the spread of results within each
+        # row, which no weights can change; add it back to report the real error
+        spread = (float(np.sum(y.astype(np.float64) ** 2)) - float(np.sum(counts * results ** 2))) / len(y)
+        before = loss(rows, results, counts, np.array(WEIGHTS[size]), scale) + spread
+        after = loss(rows, results, counts, weights, scale) + spread
+        print(f"{size}: {len(y)} positions ({len(rows)} distinct), K {scale:.5f}, "
+              f"error {before:.5f} -> {after:.5f} in {time.perf_counter() - start:.1f} s", file=sys.stderr)
+        tuned[size] = {name: round(float(w), 3) for name, w in zip(FEATURES, weights)}
+
+    with open(args.output, 'w') as f:
+        json.dump(tuned, f, indent=2)
+        f.write('\n')
+
+
+if __name__ == '__main__':
+    main()
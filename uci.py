@@ -0,0 +1,237 @@
+"""Run the AI as an engine process speaking a UCI-like protocol on stdin/stdout.
+
+    python uci.py [--size 6x6] [--weights weights.json]
+
+One command per line:
+
+    uci                 identify the engine; answered by 'uciok'
+    isready             answered by 'readyok'
+    ucinewgame          stop any search and empty the evaluation caches
+    position startpos [4x4|6x6|8x8] [moves e2e3 ...]
+    position fen <ranks> [w|b] [moves e2e3 ...]
+    go [depth N] [nodes N] [movetime MS] [wtime MS] [btime MS] [winc MS] [binc MS]
+       [movestogo N] [infinite]
+    stop                end the search and report the best move found so far
+    d                   print the position
+    quit
+
+Positions and moves use notation.py's FEN-style text and coordinate
+notation; 'position startpos' without a size uses --size. 'go' with no
+limits thinks for ai.AI_MOVE_TIME; with wtime/btime the time for the move
+comes from the side to move's clock. 'go infinite' keeps searching until
+'stop' or 'quit'; if the search ends sooner (a forced mate, or ai.MAX_DEPTH)
+its bestmove is held back until one of them arrives.
+
+The search runs on its own thread, so 'stop', 'isready' and 'quit' are
+answered while it thinks. Each finished iteration is reported as
+
+    info depth 3 score cp 42 nodes 1830 nps 9120 time 201 pv c2c3 d5d4 c3d4
+
+and the search ends with 'bestmove c2c3 ponder d5d4', or 'bestmove (none)'
+when the side to move has no legal move. Scores are from the side to
+move's point of view; 'score mate N' is a mate in N moves, negative when
+the side to move is the one being mated. Problems with a command are
+reported as 'info string ...' and the command is ignored.
+"""
+import argparse
+import sys
+import threading
+import time
+from typing import List, Optional, TextIO
+
+import ai
+from notation import board_from_fen, board_to_fen, move_to_text, text_to_move
+from records import SIZES
+from rules import Board
+
+ENGINE_NAME = "Mini Chess"
+ENGINE_AUTHOR = "Mini Chess contributors"
+
+GO_LIMITS = ('depth', 'nodes', 'movetime', 'wtime', 'btime', 'winc', 'binc', 'movestogo')
+
+
+def format_score(score: float) -> str:
+    """'cp N', or 'mate N' in moves when the score is a forced mate"""
+    if abs(score) >= ai.MATE_BOUND:
+        moves = (ai.CHECKMATE - abs(score) + 1) // 2
+        return f"mate {moves if score > 0 else -moves}"
+    return f"cp {round(score)}"
+
+
+class Engine:
+    """Protocol state: the current position and the search running on it, if any"""
+
+    def __init__(self, output: TextIO = sys.stdout, size: str = "6x6"):
+        self.output = output
+        self.size = size
+        self.board = Board(size)
+        self.turn = 'w'
+        self._searcher: Optional[ai.Searcher] = None
+        self._thread: Optional[threading.Thread] = None
+        self._release = threading.Event()  # Set when the search may send its bestmove
+        self._output_lock = threading.Lock()
+
+    def send(self, line: str):
+        with self._output_lock:
+            self.output.write(line + '\n')
+            self.output.flush()
+
+    def handle(self, line: str) -> bool:
+        """Carry out one command line; returns False on quit"""
+        tokens = line.split()
+        if not tokens:
+            return True
+        command, args = tokens[0], tokens[1:]
+        if command == 'quit':
+            self.stop()
+            return False
+        if command == 'uci':
+            self.send(f"id name {ENGINE_NAME}")
+            self.send(f"id author {ENGINE_AUTHOR}")
+            self.send("uciok")
+        elif command == 'isready':
+            self.send("readyok")
+        elif command == 'ucinewgame':
+            self.stop()
+            ai.EVAL_CACHE.clear()
+            ai.PAWN_CACHE.clear()
+        elif command == 'position':
+            self.stop()
+            try:
+                self.set_position(args)
+            except ValueError as e:
+                self.send(f"info string {e}")
+        elif command == 'go':
+            self.stop()
+            try:
+                self.go(args)
+            except ValueError as e:
+                self.send(f"info string {e}")
+        elif command == 'stop':
+            self.stop()
+        elif command == 'd':
+            self.send(board_to_fen(self.board, self.turn))
+        else:
+            self.send(f"info string unknown command {command!r}")
+        return True
+
+    def set_position(self, args: List[str]):
+        if 'moves' in args:
+            split = args.index('moves')
+            args, moves = args[:split], args[split + 1:]
+        else:
+            moves = []
+        if args[:1] == ['startpos'] and len(args) <= 2:
+            size = args[1] if len(args) == 2 else self.size
+            if size not in SIZES:
+                raise ValueError(f"unknown board size {size!r}")
+            board, turn = Board(size), 'w'
+        elif args[:1] == ['fen'] and len(args) in (2, 3):
+            board, turn = board_from_fen(' '.join(args[1:]))
+        else:
+            raise ValueError("expected 'position startpos [size]' or 'position fen <ranks> [w|b]'")
+
+        for text in moves:
+            start, end = text_to_move(text, board.dimension)
+            piece = board.get_piece_at(start)
+            if piece is None or piece.color != turn or end not in board.get_valid_moves_considering_check(piece):
+                raise ValueError(f"illegal move {text}")
+            board.move_piece(piece, end)
+            turn = 'b' if turn == 'w' else 'w'
+        self.board, self.turn = board, turn
+
+    def go(self, args: List[str]):
+        limits = {}
+        infinite = False
+        tokens = iter(args)
+        for token in tokens:
+            if token == 'infinite':
+                infinite = True
+            elif token in GO_LIMITS:
+                value = next(tokens, None)
+                if value is None or not value.isdigit():
+                    raise ValueError(f"{token} needs a whole number")
+                limits[token] = int(value)
+            else:
+                raise ValueError(f"unknown go option {token!r}")
+
+        clock = limits.get('wtime' if self.turn == 'w' else 'btime')
+        if 'movetime' in limits:
+            time_manager = ai.TimeManager(moveTime=limits['movetime'] / 1000)
+        elif clock is not None:
+            increment = limits.get('winc' if self.turn == 'w' else 'binc', 0)
+            time_manager = ai.TimeManager(remaining=clock / 1000, increment=increment / 1000,
+                                          movesToGo=limits.get('movestogo'))
+        elif infinite or 'depth' in limits or 'nodes' in limits:
+            time_manager = None
+        else:
+            time_manager = ai.TimeManager(moveTime=ai.AI_MOVE_TIME)
+
+        board = self.board.copy()
+        searcher = ai.Searcher(board, board.size, maxNodes=limits.get('nodes'), timeManager=time_manager)
+        searcher.onIteration = lambda depth, score, pv: self._report(searcher, depth, score, pv)
+        self._searcher = searcher
+        self._release = threading.Event()
+        if not infinite:
+            self._release.set()
+        self._thread = threading.Thread(target=self._search,
+                                        args=(searcher, self.turn, limits.get('depth', ai.MAX_DEPTH), self._release),
+                                        daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the running search, if any, and wait for its bestmove"""
+        if self._thread is not None:
+            self._searcher.stop()
+            self._release.set()
+            self._thread.join()
+            self._searcher = self._thread = None
+
+    def wait(self):
+        """Let the running search, if any, finish by itself; an infinite one is stopped"""
+        if self._thread is not None and not self._release.is_set():
+            self.stop()
+        elif self._thread is not None:
+            self._thread.join()
+            self._searcher = self._thread = None
+
+    def _search(self, searcher: ai.Searcher, color: str, depth: int, release: threading.Event):
+        """Runs on the search thread; the bestmove waits for release (a 'stop' under 'go infinite')"""
+        result = searcher.search(color, depth, randomize=False)
+        release.wait()
+        if result.move is None:
+            self.send("bestmove (none)")
+            return
+        dimension = searcher.board.dimension
+        line = f"bestmove {move_to_text((result.piece.position, result.move), dimension)}"
+        if result.ponderMove:
+            line += f" ponder {move_to_text(result.ponderMove, dimension)}"
+        self.send(line)
+
+    def _report(self, searcher: ai.Searcher, depth: int, score: float, pv):
+        stats = searcher.stats
+        elapsed = time.perf_counter() - stats.startTime
+        nps = round(stats.nodes / elapsed) if elapsed > 0 else 0
+        moves = ' '.join(move_to_text(move, searcher.board.dimension) for move in pv)
+        self.send(f"info depth {depth} score {format_score(score)} nodes {stats.nodes} nps {nps} "
+                  f"time {round(elapsed * 1000)} pv {moves}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size', choices=SIZES, default="6x6", help="board size for 'position startpos'")
+    parser.add_argument('--weights', metavar='PATH', help="evaluation weights written by tuner.py")
+    args = parser.parse_args()
+    if args.weights:
+        ai.loadWeights(args.weights)
+
+    engine = Engine(size=args.size)
+    for line in sys.stdin:
+        if not engine.handle(line):
+            break
+    else:
+        engine.wait()  # End of input: let a running search finish and report
+
+
+if __name__ == '__main__':
+    main()